@@ -1,8 +1,13 @@
-import re, json
-from typing import List, Dict, Any, Optional
-from .embeddings import OllamaEmbedder, OpenAIEmbedder
+import json, time, asyncio
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from .embeddings import OllamaEmbedder, OpenAIEmbedder, CachedEmbedder
+from .cache import EmbeddingCache, AnswerCache
 from .llm import OllamaLLM, OpenAILLM
-from .tools import TOOLS, search_qdrant
+from .tools import search_qdrant, tool_specs, call_tool, close_qclient
+from .rerank import CrossEncoderReranker
+from .context import build_context
+from .clients import close_http_client
 from .config import settings
 
 # --- Choose backend depending on key ---
@@ -10,9 +15,24 @@ if getattr(settings, "openai_api_key", None):  # if key exists in config
     embedder = OpenAIEmbedder(api_key=settings.openai_api_key)
     llm = OpenAILLM(api_key=settings.openai_api_key)
 else:
-    embedder = OllamaEmbedder()
+    embedder = OllamaEmbedder(settings.embedding_model, settings.ollama_url)
     llm = OllamaLLM()
 
+if settings.embedding_cache_size > 0:
+    embedder = CachedEmbedder(embedder, EmbeddingCache(
+        max_items=settings.embedding_cache_size,
+        ttl=settings.embedding_cache_ttl,
+        path=settings.embedding_cache_path,
+    ))
+
+answer_cache = AnswerCache(
+    max_items=settings.answer_cache_size,
+    threshold=settings.answer_cache_threshold,
+    ttl=settings.answer_cache_ttl,
+) if settings.answer_cache_size > 0 else None
+
+reranker = CrossEncoderReranker(settings.rerank_model, batch_size=settings.rerank_batch_size) if settings.rerank_model else None
+
 
 PROMPT_SYSTEM = """You are MeetingAgent.
 When answering, provide a concise, actionable answer and list explicit action items if relevant."""
@@ -26,78 +46,175 @@ QUESTION:
 Strictly use context data and return answer based on that on more concise and readable way.
 
 """
-# If you call a tool, use the exact token: CALL_TOOL(name,args_json)
-# Example: CALL_TOOL(qdrant.search, {{"query":"budget", "top_k":5}})
-# Otherwise reply with ANSWER: <your answer>
+
+@contextmanager
+def _timed(steps: List[Dict[str,Any]], name: str, **info):
+    """Append {"step", "ms", **info} to `steps` when the block finishes."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        steps.append({"step": name, "ms": round((time.perf_counter() - t0) * 1000, 1), **info})
 
 
 def prepare_context(hits: List[Dict[str,Any]], max_items: Optional[int] = None) -> str:
     items = hits[: (max_items or settings.top_k)]
-    blocks = []
-    for h in items:
-        p = h.get("payload", {})
-        text = p.get("text") or p.get("excerpt") or ""
-        title = p.get("title") or p.get("origin_id") or "(doc)"
-        blocks.append(text)
-        # blocks.append(f"-- {title} (score={h['score']:.3f})\n{text[:800]}")
-    return "\n\n".join(blocks)
-
-
-def run_agent(query: str, use_retrieval: bool = True, max_context_items: Optional[int] = None) -> Dict[str,Any]:
-    """Run a react-style agent with optional retrieval."""
+    return build_context(items, settings.context_max_tokens, settings.context_dedup_threshold)
+
+
+async def retrieve(query: str, qvec: List[List[float]], max_context_items: Optional[int] = None,
+                   filters: Optional[Dict[str,Any]] = None) -> List[Dict[str,Any]]:
+    """Search Qdrant; with a reranker, over-fetch candidates and keep the best few."""
+    if reranker is None:
+        return await search_qdrant(qvec, top_k=(max_context_items or settings.top_k), query=query, filters=filters)
+    keep = max_context_items or settings.rerank_top_n
+    hits = await search_qdrant(qvec, top_k=max(settings.rerank_candidates, keep), query=query, filters=filters)
+    return await reranker.rerank(query, hits, top_n=keep)
+
+
+async def run_agent(query: str, use_retrieval: bool = True, max_context_items: Optional[int] = None,
+                    filters: Optional[Dict[str,Any]] = None, mode: Optional[str] = None) -> Dict[str,Any]:
+    """Answer `query`, retrieving first when `use_retrieval` is set.
+
+    "retrieval_first" mode (default) makes exactly one generation over the
+    retrieved context. "react" mode lets the model call tools (native
+    function calling) for more context,
+    bounded by settings.agent_max_steps and agent_time_budget. The result
+    carries per-step timings under "steps".
+    """
+    mode = mode or settings.agent_mode
+    steps: List[Dict[str,Any]] = []
+    hits: List[Dict[str,Any]] = []
+    if use_retrieval:
+        with _timed(steps, "embed"):
+            qvec = await embedder.embed([query])
+        with _timed(steps, "retrieve"):
+            hits = await retrieve(query, qvec, max_context_items, filters)
+        if answer_cache is not None:
+            cached = answer_cache.lookup(qvec[0], hits, mode)
+            if cached is not None:
+                return {"text": cached, "retrieved": hits, "cached": True, "steps": steps}
+
+    context = prepare_context(hits, max_context_items) if hits else "(no context)"
+    if mode == "react":
+        res = await _react(query, context, hits, filters, steps)
+    else:
+        prompt = PROMPT_SYSTEM + "\n\n" + PROMPT_USER.format(context=context, question=query)
+        with _timed(steps, "generate"):
+            text = ((await llm.simple_text(prompt)) or "").strip()
+        res = {"text": text, "retrieved": hits}
+
+    # only answers grounded in exactly `hits` are reusable; never cache the stop notice
+    if answer_cache is not None and use_retrieval and res.get("retrieved") is hits and not res.get("stopped"):
+        answer_cache.store(qvec[0], hits, res["text"], mode)
+    res["steps"] = steps
+    return res
+
+
+def _tool_content(name: str, output: Any) -> str:
+    # search hits go back to the model as context text, not raw payload JSON
+    if name == "qdrant_search" and isinstance(output, list):
+        return prepare_context(output) or "(no results)"
+    return json.dumps(output, default=str)
+
+
+async def _react(query: str, context: str, retrieved: List[Dict[str,Any]], filters: Optional[Dict[str,Any]],
+                 steps: List[Dict[str,Any]]) -> Dict[str,Any]:
+    """Native function-calling loop: at most settings.agent_max_steps
+    generations within settings.agent_time_budget seconds, tool calls
+    included. Tool calls of one turn run concurrently; the last generation
+    gets no tools, so it answers. Running out of steps or time returns a
+    notice flagged "stopped"."""
+    deadline = time.monotonic() + settings.agent_time_budget
+    messages = [
+        {"role": "system", "content": PROMPT_SYSTEM},
+        {"role": "user", "content": PROMPT_USER.format(context=context, question=query)},
+    ]
+    seen = {h["id"] for h in retrieved}
+    for step in range(settings.agent_max_steps):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        tools = tool_specs() if step < settings.agent_max_steps - 1 else None
+        try:
+            with _timed(steps, "generate"):
+                reply = await asyncio.wait_for(llm.chat(messages, tools=tools), timeout=remaining)
+        except asyncio.TimeoutError:
+            break
+        calls = reply["tool_calls"]
+        if not calls:
+            return {"text": reply["content"].strip(), "retrieved": retrieved}
+
+        messages.append(reply["message"])
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            with _timed(steps, "tools", tools=[c["name"] for c in calls]):
+                outputs = await asyncio.wait_for(
+                    asyncio.gather(*(call_tool(c["name"], c["arguments"], embed=embedder.embed, filters=filters)
+                                     for c in calls)),
+                    timeout=remaining)
+        except asyncio.TimeoutError:
+            break
+        for call, output in zip(calls, outputs):
+            if call["name"] == "qdrant_search" and isinstance(output, list):
+                new = [h for h in output if h["id"] not in seen]
+                seen.update(h["id"] for h in new)
+                retrieved = retrieved + new
+            messages.append(llm.tool_message(call, _tool_content(call["name"], output)))
+
+    return {"text": f"Agent stopped: no answer within {settings.agent_max_steps} steps / "
+                    f"{settings.agent_time_budget:.0f}s", "retrieved": retrieved, "stopped": True}
+
+
+async def stream_agent(query: str, use_retrieval: bool = True, max_context_items: Optional[int] = None,
+                       filters: Optional[Dict[str,Any]] = None, mode: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Retrieve first, emit the hits, then forward LLM tokens as they arrive.
+
+    Yields (event, data) pairs: one ("retrieved", hits), ("message", token)*,
+    then ("steps", timings). "react" mode cannot stream tokens across tool
+    calls, so its answer is emitted as a single message.
+    """
+    if (mode or settings.agent_mode) == "react":
+        res = await run_agent(query, use_retrieval, max_context_items, filters=filters, mode="react")
+        yield "retrieved", res["retrieved"]
+        yield "message", res["text"]
+        yield "steps", res["steps"]
+        return
 
     context = "(no context)"
     retrieved = []
-
-    while True:
-        # Ask model what to do
-        prompt = PROMPT_SYSTEM + "\n\n" + PROMPT_USER.format(context=context, question=query)
-        decision = (llm.simple_text(prompt) or "").strip()
-
-        # --- Tool Call ---
-        if decision.startswith("CALL_TOOL"):
-            m = re.search(r'CALL_TOOL\(([^,]+)\s*,\s*(\{.*\})\)', decision)
-            if not m:
-                return {"text": "Agent error: malformed CALL_TOOL", "retrieved": retrieved}
-
-            tool_name = m.group(1).strip()
-            try:
-                args = json.loads(m.group(2))
-            except Exception:
-                args = {}
-
-            tool = TOOLS.get(tool_name)
-            tool_output = None
-            if tool:
-                if tool_name == "qdrant.search" and "query" in args:
-                    qvec = embedder.embed([args["query"]])[0]
-                    top_k = args.get("top_k") or settings.top_k
-                    hits = tool(qvec, top_k=top_k)
-                    tool_output = hits
-                    retrieved = hits
-                else:
-                    tool_output = tool(**args)
-
-            # Inject tool output back to model
-            context = f"TOOL_OUTPUT({tool_name},{json.dumps(tool_output)})"
-            continue  # loop again → model sees updated context
-
-        # --- Direct Answer ---
-        elif decision.startswith("ANSWER:"):
-            return {"text": decision.replace("ANSWER:", "").strip(), "retrieved": retrieved}
-
-        # --- No tool requested, but retrieval is allowed ---
-        else:
-            if use_retrieval:
-                qvec = embedder.embed([query])
-                hits = search_qdrant(qvec, top_k=(max_context_items or settings.top_k))
-                retrieved = hits
-                ctx = prepare_context(hits, max_context_items)
-                # re-ask model with retrieval context
-                context = ctx
-                use_retrieval = False  # prevent infinite loop
-                continue
-            else:
-                import ast
-                data = ast.literal_eval(decision)
-                return {"text": data["response"], "retrieved": retrieved}
+    steps: List[Dict[str,Any]] = []
+    if use_retrieval:
+        with _timed(steps, "embed"):
+            qvec = await embedder.embed([query])
+        with _timed(steps, "retrieve"):
+            retrieved = await retrieve(query, qvec, max_context_items, filters)
+        context = prepare_context(retrieved, max_context_items)
+    yield "retrieved", retrieved
+
+    if answer_cache is not None and retrieved:
+        cached = answer_cache.lookup(qvec[0], retrieved, "retrieval_first")
+        if cached is not None:
+            yield "message", cached
+            yield "steps", steps
+            return
+
+    prompt = PROMPT_SYSTEM + "\n\n" + PROMPT_USER.format(context=context, question=query)
+    tokens = []
+    with _timed(steps, "generate"):
+        async for token in llm.stream_text(prompt):
+            tokens.append(token)
+            yield "message", token
+    if answer_cache is not None and retrieved:
+        answer_cache.store(qvec[0], retrieved, "".join(tokens), "retrieval_first")
+    yield "steps", steps
+
+
+async def shutdown():
+    """Release pooled connections held by the embedder, LLM and Qdrant clients."""
+    await embedder.aclose()
+    await llm.aclose()
+    await close_qclient()
+    await close_http_client()
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+class EmbeddingCache:
+    """LRU + TTL cache for query embeddings, keyed by (model, normalized text).
+
+    An optional SQLite file acts as a second tier shared between backend workers;
+    vectors are stored there as packed float32.
+    """
+
+    def __init__(self, max_items: int = 1024, ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._puts = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return f"{model}\x00{normalize_query(text)}"
+
+    def _get_memory(self, key: str) -> Optional[List[float]]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        vector, created = item
+        if time.time() - created > self.ttl:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return vector
+
+    def _put_memory(self, key: str, vector: List[float], created: float):
+        self._items[key] = (vector, created)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def _get_disk(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            row = self._db.execute("SELECT vector, created FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return array("f", row[0]).tolist(), row[1]
+
+    def _put_disk(self, key: str, vector: List[float], created: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created) VALUES (?, ?, ?)",
+                (key, array("f", vector).tobytes(), created),
+            )
+            self._puts += 1
+            if self._puts % 256 == 0:
+                self._db.execute("DELETE FROM embeddings WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = self.key(model, text)
+        vector = self._get_memory(key)
+        if vector is None and self._db is not None:
+            found = await asyncio.to_thread(self._get_disk, key)
+            if found is not None:
+                vector = found[0]
+                self._put_memory(key, vector, found[1])
+                self.disk_hits += 1
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    async def put(self, model: str, text: str, vector: List[float]):
+        key = self.key(model, text)
+        now = time.time()
+        self._put_memory(key, vector, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, vector, now)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def hits_signature(hits: List[Dict[str, Any]]) -> str:
+    """Identity of a retrieval result: chunk IDs plus a digest of their text.
+
+    Re-indexing that changes point IDs or chunk contents yields a new signature,
+    so answers built on stale context are never served.
+    """
+    h = hashlib.sha1()
+    for hit in hits:
+        h.update(str(hit.get("id")).encode("utf-8"))
+        h.update(b"\x00")
+        h.update(((hit.get("payload") or {}).get("text") or "").encode("utf-8"))
+        h.update(b"\x01")
+    return h.hexdigest()
+
+
+class AnswerCache:
+    """Semantic response cache.
+
+    A cached answer is reused when the new query embedding is within
+    `threshold` cosine similarity of a cached query, retrieval returned the
+    same chunks (same `hits_signature`) and the answer came from the same
+    agent `mode`.
+    """
+
+    def __init__(self, max_items: int = 512, threshold: float = 0.95, ttl: float = 86400.0):
+        self.max_items = max_items
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: List[Dict[str, Any]] = []
+        self._matrix = None
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    def lookup(self, vector: List[float], hits: List[Dict[str, Any]], mode: str = "") -> Optional[str]:
+        if not self._entries or not hits:
+            self.misses += 1
+            return None
+        if self._matrix is None:
+            self._matrix = np.stack([e["vector"] for e in self._entries])
+        sims = self._matrix @ self._unit(vector)
+        signature = hits_signature(hits)
+        now = time.time()
+        for i in np.argsort(-sims):
+            if sims[i] < self.threshold:
+                break
+            entry = self._entries[i]
+            if entry["signature"] == signature and entry["mode"] == mode and now - entry["created"] <= self.ttl:
+                self.hits += 1
+                return entry["answer"]
+        self.misses += 1
+        return None
+
+    def store(self, vector: List[float], hits: List[Dict[str, Any]], answer: str, mode: str = ""):
+        if not hits or not answer:
+            return
+        self._entries.append({
+            "vector": self._unit(vector),
+            "signature": hits_signature(hits),
+            "mode": mode,
+            "answer": answer,
+            "created": time.time(),
+        })
+        if len(self._entries) > self.max_items:
+            self._entries = self._entries[-self.max_items:]
+        self._matrix = None
+
+    def invalidate(self):
+        self._entries = []
+        self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_items": self.max_items,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
@@ -0,0 +1,22 @@
+import httpx
+from .config import settings
+
+_http = None
+def get_http_client() -> httpx.AsyncClient:
+    """Shared connection pool for all outgoing HTTP calls (Ollama embed/generate)."""
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            timeout=settings.http_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_connections,
+            ),
+        )
+    return _http
+
+async def close_http_client():
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -9,8 +10,29 @@ class Settings(BaseSettings):
     llm_model: str = "llama3"
     # openai_api_key: str = ""
     top_k: int = 10
-    score_threshold: float = 0.2
-    sse_chunk_delay: float = 0.01
+    score_threshold: Optional[float] = 0.2  # min dense similarity of retrieved chunks; None disables
+    sparse_vector_name: Optional[str] = "bm25"  # hybrid BM25 + dense search; empty = dense only
+    hybrid_candidates: int = 50  # candidates per retriever before rank fusion
+    rerank_model: Optional[str] = None  # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2" (needs sentence-transformers)
+    rerank_candidates: int = 30  # hits fetched from Qdrant for the reranker
+    rerank_top_n: int = 5  # hits kept for the prompt (max_context_items overrides)
+    rerank_batch_size: int = 16
+    context_max_tokens: int = 3000  # prompt context budget (estimated tokens)
+    context_dedup_threshold: float = 0.85  # drop chunks whose text is this much already in the context
+    hnsw_ef: Optional[int] = None  # search beam width; None = collection default
+    quantization_rescore: bool = True  # re-rank quantized candidates with original vectors
+    quantization_oversampling: Optional[float] = None
+    agent_mode: Literal["retrieval_first", "react"] = "retrieval_first"  # one generation over retrieved context; "react" allows tool calls
+    agent_max_steps: int = 4  # max LLM generations per request in "react" mode
+    agent_time_budget: float = 120.0  # seconds for the whole "react" loop
+    http_timeout: float = 300.0
+    http_max_connections: int = 64
+    embedding_cache_size: int = 1024  # 0 disables the query-embedding cache
+    embedding_cache_ttl: float = 3600.0
+    embedding_cache_path: Optional[str] = None  # SQLite file shared across workers
+    answer_cache_size: int = 512  # 0 disables the semantic answer cache
+    answer_cache_threshold: float = 0.95  # min cosine similarity between queries
+    answer_cache_ttl: float = 86400.0
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,120 @@
+"""Assemble the prompt context from retrieved hits within a token budget.
+
+Consecutive chunks of the same document (chunk ids "<doc_id>#<n>") are merged
+with their overlap removed, blocks repeating text already selected are
+dropped, and the rest are added best-first until the budget is used.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English with BPE tokenizers
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class _Block:
+    doc: str
+    idx: Optional[int]
+    text: str
+    score: float
+
+
+def _score(hit: Dict[str, Any]) -> float:
+    return float(hit.get("rerank_score", hit.get("score", 0.0)))
+
+
+def _position(hit: Dict[str, Any]):
+    p = hit.get("payload") or {}
+    cid = str(p.get("chunk_id") or p.get("_orig_id") or "")
+    doc, _, n = cid.rpartition("#")
+    if doc and n.isdigit():
+        return p.get("doc_id") or doc, int(n)
+    return p.get("doc_id") or str(hit.get("id")), None
+
+
+def _merge_text(a: str, b: str, min_overlap: int = 20) -> str:
+    """Append b to a, dropping the longest suffix of a that b starts with."""
+    tail = a[-len(b):]
+    probe = b[:min_overlap]
+    start = tail.find(probe)
+    while start != -1:
+        if b.startswith(tail[start:]):
+            return a + b[len(tail) - start:]
+        start = tail.find(probe, start + 1)
+    return a + "\n" + b
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)}
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def merge_adjacent(hits: List[Dict[str, Any]]) -> List[_Block]:
+    """One block per run of consecutive chunks of a document, scored by its best hit."""
+    by_doc: Dict[str, List] = {}
+    for h in hits:
+        text = (h.get("payload") or {}).get("text") or (h.get("payload") or {}).get("excerpt") or ""
+        if not text.strip():
+            continue
+        doc, idx = _position(h)
+        by_doc.setdefault(doc, []).append((idx, text, _score(h)))
+    blocks: List[_Block] = []
+    for doc, items in by_doc.items():
+        items.sort(key=lambda t: (t[0] is None, t[0] or 0))
+        for idx, text, score in items:
+            last = blocks[-1] if blocks and blocks[-1].doc == doc else None
+            if last is not None and idx is not None and last.idx is not None:
+                if idx == last.idx:
+                    last.score = max(last.score, score)  # same chunk retrieved twice
+                    continue
+                if idx == last.idx + 1:
+                    last.text = _merge_text(last.text, text)
+                    last.idx = idx
+                    last.score = max(last.score, score)
+                    continue
+            blocks.append(_Block(doc, idx, text, score))
+    return blocks
+
+
+def _truncate(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """Longest prefix of `text` within `max_tokens` by `count_tokens` (binary search on length)."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def build_context(hits: List[Dict[str, Any]], max_tokens: int, dedup_threshold: float = 0.85,
+                  count_tokens: Callable[[str], int] = estimate_tokens) -> str:
+    """Best-scoring merged blocks that fit in `max_tokens`, skipping blocks whose
+    word shingles are at least `dedup_threshold` contained in selected text."""
+    blocks = sorted(merge_adjacent(hits), key=lambda b: b.score, reverse=True)
+    selected: List[str] = []
+    seen: set = set()
+    used = 0
+    for b in blocks:
+        sh = _shingles(b.text)
+        if sh and len(sh & seen) / len(sh) >= dedup_threshold:
+            continue
+        cost = count_tokens(b.text)
+        if used + cost > max_tokens:
+            if selected:
+                continue  # a smaller block further down may still fit
+            # the best block alone is over budget: keep its head
+            b.text = _truncate(b.text, max_tokens, count_tokens)
+            cost = count_tokens(b.text)
+        selected.append(b.text)
+        seen |= sh
+        used += cost
+    return "\n\n".join(selected)
@@ -1,26 +1,30 @@
-import requests
+import asyncio
 import os
 from typing import List
 from .config import settings
+from .clients import get_http_client
+from .cache import EmbeddingCache
 
 class OllamaEmbedder:
     def __init__(self, model: str = "nomic-embed-text", base_url: str = "http://localhost:11434"):
         self.model = model
         self.base_url = base_url
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    async def _embed_one(self, text: str) -> List[float]:
+        r = await get_http_client().post(
+            f"{self.base_url}/api/embeddings",
+            json={"model": self.model, "prompt": text},
+            timeout=120
+        )
+        r.raise_for_status()
+        return r.json()["embedding"]
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
         """Call Ollama API for embeddings"""
-        vectors = []
-        for t in texts:
-            r = requests.post(
-                f"{self.base_url}/api/embeddings",
-                json={"model": self.model, "prompt": t},
-                timeout=120
-            )
-            r.raise_for_status()
-            data = r.json()
-            vectors.append(data["embedding"])
-        return vectors
+        return list(await asyncio.gather(*(self._embed_one(t) for t in texts)))
+
+    async def aclose(self):
+        pass
 
 
 # ✅ Add OpenAI Embedder here
@@ -29,12 +33,38 @@ class OpenAIEmbedder:
         import openai
         self.model = model
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.client = openai.AsyncOpenAI(api_key=self.api_key)
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    async def embed(self, texts: List[str]) -> List[List[float]]:
         """Call OpenAI API for embeddings"""
-        resp = self.client.embeddings.create(
+        resp = await self.client.embeddings.create(
             model=self.model,
             input=texts
         )
         return [d.embedding for d in resp.data]
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class CachedEmbedder:
+    """Wraps an embedder and serves repeated queries from an EmbeddingCache."""
+
+    def __init__(self, embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.model = embedder.model
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = [await self.cache.get(self.model, t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = await self.embedder.embed([texts[i] for i in missing])
+            for i, v in zip(missing, fresh):
+                vectors[i] = v
+                await self.cache.put(self.model, texts[i], v)
+        return vectors
+
+    async def aclose(self):
+        await self.embedder.aclose()
+        self.cache.close()
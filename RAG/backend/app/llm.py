@@ -1,23 +1,35 @@
-
-import requests
+import os
+import json
+from typing import AsyncIterator, Any, Dict, List, Optional
 from .config import settings
+from .clients import get_http_client
+
+def _parse_args(arguments: Any) -> Dict[str, Any]:
+    """Tool-call arguments arrive as a dict (Ollama) or a JSON string (OpenAI)."""
+    if isinstance(arguments, dict):
+        return arguments
+    try:
+        args = json.loads(arguments or "{}")
+    except ValueError:
+        return {}
+    return args if isinstance(args, dict) else {}
 
 class OllamaLLM:
     def __init__(self, base_url: str = None, model: str = None):
         self.base = base_url or settings.ollama_url
-        self.base = "http://localhost:11434"
-        self.model = "llama3"
+        self.model = model or settings.llm_model
 
-    def generate(self, prompt: str, timeout: int = 300):
-        print(self.model, prompt)
+    async def generate(self, prompt: str, timeout: int = 300):
         body = {"model": self.model, "prompt": prompt, "max_tokens": 512, "temperature": 0.2, "stream": False}
-        r = requests.post(f"{self.base}/api/generate", json=body, timeout=timeout)
+        r = await get_http_client().post(f"{self.base}/api/generate", json=body, timeout=timeout)
         r.raise_for_status()
         return r.json()
 
-    def simple_text(self, prompt: str, timeout: int = 300) -> str:
-        resp = self.generate(prompt, timeout=timeout)
+    async def simple_text(self, prompt: str, timeout: int = 300) -> str:
+        resp = await self.generate(prompt, timeout=timeout)
         if isinstance(resp, dict):
+            if "response" in resp:
+                return resp["response"]
             if "text" in resp:
                 return resp["text"]
             if "generation" in resp:
@@ -31,15 +43,51 @@ class OllamaLLM:
                     return str(first)
         return str(resp)
 
+    async def stream_text(self, prompt: str, timeout: int = 300) -> AsyncIterator[str]:
+        """Yield response tokens as Ollama produces them (NDJSON stream)."""
+        body = {"model": self.model, "prompt": prompt, "max_tokens": 512, "temperature": 0.2, "stream": True}
+        async with get_http_client().stream("POST", f"{self.base}/api/generate", json=body, timeout=timeout) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+
+    async def chat(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                   timeout: float = 300) -> Dict[str, Any]:
+        """One /api/chat turn. Returns {"content", "tool_calls": [{"id", "name", "arguments"}], "message"}
+        where "message" is the assistant message to append to the history."""
+        body = {"model": self.model, "messages": messages, "stream": False,
+                "options": {"temperature": 0.2, "num_predict": 512}}
+        if tools:
+            body["tools"] = tools
+        r = await get_http_client().post(f"{self.base}/api/chat", json=body, timeout=timeout)
+        r.raise_for_status()
+        msg = r.json().get("message") or {}
+        calls = [{"id": str(i), "name": c["function"]["name"], "arguments": _parse_args(c["function"].get("arguments"))}
+                 for i, c in enumerate(msg.get("tool_calls") or [])]
+        return {"content": msg.get("content") or "", "tool_calls": calls, "message": msg}
+
+    @staticmethod
+    def tool_message(call: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {"role": "tool", "content": content, "tool_name": call["name"]}
+
+    async def aclose(self):
+        pass
+
 class OpenAILLM:
     def __init__(self, model: str = "gpt-4o-mini", api_key: str = None):
         import openai
         self.model = model
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.client = openai.AsyncOpenAI(api_key=self.api_key)
 
-    def simple_text(self, prompt: str) -> str:
-        resp = self.client.chat.completions.create(
+    async def simple_text(self, prompt: str) -> str:
+        resp = await self.client.chat.completions.create(
             model=self.model,
             messages=[
                 {"role": "system", "content": "You are a helpful AI."},
@@ -48,4 +96,44 @@ class OpenAILLM:
             temperature=0.2,
             max_tokens=512
         )
-        return resp.choices[0].message.content
\ No newline at end of file
+        return resp.choices[0].message.content
+
+    async def stream_text(self, prompt: str) -> AsyncIterator[str]:
+        """Yield completion tokens as OpenAI streams them."""
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a helpful AI."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=512,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def chat(self, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None,
+                   timeout: float = 300) -> Dict[str, Any]:
+        """One chat completion turn; same signature and return shape as OllamaLLM.chat."""
+        kwargs = {"tools": tools} if tools else {}
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.2,
+            max_tokens=512,
+            timeout=timeout,
+            **kwargs
+        )
+        msg = resp.choices[0].message
+        calls = [{"id": c.id, "name": c.function.name, "arguments": _parse_args(c.function.arguments)}
+                 for c in msg.tool_calls or []]
+        return {"content": msg.content or "", "tool_calls": calls, "message": msg.model_dump(exclude_none=True)}
+
+    @staticmethod
+    def tool_message(call: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {"role": "tool", "tool_call_id": call["id"], "content": content}
+
+    async def aclose(self):
+        await self.client.close()
@@ -3,12 +3,17 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from sse_starlette.sse import EventSourceResponse
 from .schemas import ChatRequest
-from .agent import run_agent
-import asyncio
-from .config import settings
+from .agent import run_agent, stream_agent, shutdown, embedder, answer_cache
+from contextlib import asynccontextmanager
+import json
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Meeting Agent with Tools")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await shutdown()
+
+app = FastAPI(title="Meeting Agent with Tools", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # your frontend port
@@ -17,9 +22,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _filters(req: ChatRequest):
+    return req.filters.model_dump(exclude_none=True) if req.filters else None
+
 @app.post("/chat")
 async def chat(req: ChatRequest):
-    res = run_agent(req.query, use_retrieval=req.use_retrieval, max_context_items=req.max_context_items)
+    res = await run_agent(req.query, use_retrieval=req.use_retrieval, max_context_items=req.max_context_items,
+                          filters=_filters(req), mode=req.mode)
     return JSONResponse(content=res)
 
 @app.post("/chat/stream")
@@ -27,11 +36,26 @@ async def chat_stream(request: Request):
     body = await request.json()
     req = ChatRequest(**body)
     async def event_gen():
-        res = run_agent(req.query, use_retrieval=req.use_retrieval, max_context_items=req.max_context_items)
-        text = res.get('text') or ''
-        chunk_size = 200
-        for i in range(0, len(text), chunk_size):
-            yield {"event":"message","data": text[i:i+chunk_size]}
-            await asyncio.sleep(settings.sse_chunk_delay)
-        yield {"event":"retrieved","data": str(res.get('retrieved', []))}
+        async for event, data in stream_agent(req.query, use_retrieval=req.use_retrieval, max_context_items=req.max_context_items,
+                                              filters=_filters(req), mode=req.mode):
+            if event in ("retrieved", "steps"):
+                yield {"event": event, "data": json.dumps(data)}
+            else:
+                yield {"event": "message", "data": data}
+        yield {"event": "done", "data": ""}
     return EventSourceResponse(event_gen())
+
+@app.get("/cache/stats")
+async def cache_stats():
+    cache = getattr(embedder, "cache", None)
+    return JSONResponse(content={
+        "embeddings": cache.stats() if cache else None,
+        "answers": answer_cache.stats() if answer_cache else None,
+    })
+
+@app.post("/cache/invalidate")
+async def cache_invalidate():
+    """Drop cached answers, e.g. after the collection has been re-indexed."""
+    if answer_cache:
+        answer_cache.invalidate()
+    return JSONResponse(content={"ok": True})
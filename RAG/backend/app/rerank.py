@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=2)
+def _load_model(name: str):
+    # optional dependency; loaded once per process on first use
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(name, device="cpu")
+
+
+class CrossEncoderReranker:
+    """Re-score retrieved chunks with a cross-encoder over (query, chunk text) pairs.
+
+    Inference runs in a worker thread so the event loop keeps serving. If
+    sentence-transformers is not installed, hits are passed through in
+    retrieval order.
+    """
+
+    def __init__(self, model: str, batch_size: int = 16):
+        self.model = model
+        self.batch_size = batch_size
+        self.available = True
+
+    def _score(self, query: str, texts: List[str]) -> List[float]:
+        model = _load_model(self.model)
+        return [float(s) for s in model.predict([(query, t) for t in texts], batch_size=self.batch_size)]
+
+    async def rerank(self, query: str, hits: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+        if not hits or not self.available:
+            return hits[:top_n]
+        texts = [(h.get("payload") or {}).get("text") or "" for h in hits]
+        try:
+            scores = await asyncio.to_thread(self._score, query, texts)
+        except ImportError:
+            logger.warning("sentence-transformers is not installed; reranking disabled")
+            self.available = False
+            return hits[:top_n]
+        ranked = sorted(({**h, "rerank_score": s} for h, s in zip(hits, scores)),
+                        key=lambda h: h["rerank_score"], reverse=True)
+        return ranked[:top_n]
@@ -1,11 +1,27 @@
 
-from pydantic import BaseModel
-from typing import List, Optional, Any, Dict
+from pydantic import BaseModel, field_validator
+from typing import List, Optional, Any, Dict, Literal
+
+class SearchFilters(BaseModel):
+    """Restrict retrieval to matching chunks. List fields match any value;
+    a single string is accepted too."""
+    origin_id: Optional[List[str]] = None  # meeting id / document path
+    speaker: Optional[List[str]] = None  # matches the chunk speaker or any speaker of a window
+    source: Optional[List[str]] = None  # "mised", "drive", ...
+    time_from: Optional[int] = None  # payload timestamp, epoch ms, inclusive
+    time_to: Optional[int] = None
+
+    @field_validator("origin_id", "speaker", "source", mode="before")
+    @classmethod
+    def _listify(cls, v):
+        return [v] if isinstance(v, str) else v
 
 class ChatRequest(BaseModel):
     query: str
     use_retrieval: bool = True
     max_context_items: Optional[int] = None
+    filters: Optional[SearchFilters] = None
+    mode: Optional[Literal["retrieval_first", "react"]] = None  # default from settings.agent_mode
 
 class ToolCall(BaseModel):
     name: str
@@ -14,3 +30,5 @@ class ToolCall(BaseModel):
 class ChatResponse(BaseModel):
     text: str
     retrieved: List[Dict] = []
+    cached: bool = False
+    steps: List[Dict[str, Any]] = []  # {"step": "embed"|"retrieve"|"generate"|"tool", "ms": ...}
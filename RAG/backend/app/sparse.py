@@ -0,0 +1,30 @@
+"""Query side of the BM25 sparse vectors written by the indexer.
+
+Copy of indexing/src/sparse.py's tokenizer: both must hash tokens to the
+same indices. Query terms get weight 1; Qdrant applies IDF (`modifier: idf`).
+"""
+from __future__ import annotations
+from typing import List, Tuple
+import re
+import zlib
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in into is it its of on or so that the their then there
+these they this to was we were will with you your he she him her them our us do does did not no yes
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def token_index(token: str) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def encode_query(text: str) -> Tuple[List[int], List[float]]:
+    indices = sorted({token_index(t) for t in tokenize(text)})
+    return indices, [1.0] * len(indices)
@@ -1,26 +1,151 @@
-
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient
+import logging
+from typing import List, Dict, Any, Optional
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models as qm
 from .config import settings
+from .sparse import encode_query
+
+logger = logging.getLogger(__name__)
 
 _qclient = None
+_hybrid: Optional[bool] = None  # whether the collection has the sparse vector; None = not checked yet
 def _get_qclient():
     global _qclient
     if _qclient is None:
-        _qclient = QdrantClient(url=settings.qdrant_url)
+        _qclient = AsyncQdrantClient(url=settings.qdrant_url)
     return _qclient
 
-def search_qdrant(vector: List[float], top_k: int = 8) -> List[Dict[str, Any]]:
+async def close_qclient():
+    global _qclient
+    if _qclient is not None:
+        await _qclient.close()
+        _qclient = None
+
+def build_filter(filters: Optional[Dict[str, Any]]) -> Optional[qm.Filter]:
+    """Qdrant filter from SearchFilters fields (served by the indexer's payload indexes)."""
+    if not filters:
+        return None
+    must = []
+    for key in ("origin_id", "source"):
+        if filters.get(key):
+            must.append(qm.FieldCondition(key=key, match=qm.MatchAny(any=filters[key])))
+    if filters.get("speaker"):
+        # single-speaker chunks set "speaker", merged windows list "speakers"
+        match = qm.MatchAny(any=filters["speaker"])
+        must.append(qm.Filter(should=[qm.FieldCondition(key="speaker", match=match),
+                                      qm.FieldCondition(key="speakers", match=match)]))
+    if filters.get("time_from") is not None or filters.get("time_to") is not None:
+        must.append(qm.FieldCondition(key="timestamp", range=qm.Range(gte=filters.get("time_from"), lte=filters.get("time_to"))))
+    return qm.Filter(must=must) if must else None
+
+def _search_params() -> qm.SearchParams:
+    # quantization params are ignored by collections without quantization
+    return qm.SearchParams(hnsw_ef=settings.hnsw_ef, quantization=qm.QuantizationSearchParams(
+        rescore=settings.quantization_rescore, oversampling=settings.quantization_oversampling))
+
+def _hybrid_query(vector: List[float], query: str, top_k: int, query_filter: Optional[qm.Filter]) -> Optional[Dict[str, Any]]:
+    """query_points arguments fusing dense and BM25 candidates with reciprocal rank fusion."""
+    indices, values = encode_query(query)
+    if not indices:
+        return None
+    limit = max(settings.hybrid_candidates, top_k)
+    return dict(
+        prefetch=[
+            # the threshold only makes sense for cosine scores, not BM25 ones
+            qm.Prefetch(query=vector, filter=query_filter, score_threshold=settings.score_threshold,
+                        params=_search_params(), limit=limit),
+            qm.Prefetch(query=qm.SparseVector(indices=indices, values=values),
+                        using=settings.sparse_vector_name, filter=query_filter, limit=limit),
+        ],
+        query=qm.FusionQuery(fusion=qm.Fusion.RRF),
+    )
+
+async def _hybrid_available(client) -> bool:
+    """Check once whether the collection has the sparse vector. A failed
+    lookup is not cached, so a transient error only affects this request."""
+    global _hybrid
+    if not settings.sparse_vector_name:
+        return False
+    if _hybrid is None:
+        try:
+            info = await client.get_collection(collection_name=settings.qdrant_collection)
+        except Exception as e:
+            logger.warning("Could not read collection info (%s); dense search for this request", e)
+            return False
+        _hybrid = settings.sparse_vector_name in (info.config.params.sparse_vectors or {})
+        if not _hybrid:
+            logger.warning("Collection '%s' has no sparse vector '%s'; using dense search only",
+                           settings.qdrant_collection, settings.sparse_vector_name)
+    return _hybrid
+
+async def search_qdrant(vector: List[float], top_k: int = 8, query: Optional[str] = None,
+                        filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Dense search, or hybrid dense + sparse search fused with RRF when the
+    query text is given. Scores are then RRF scores, not cosine similarities.
+    `filters` (SearchFilters fields) and settings.score_threshold are applied by Qdrant."""
     client = _get_qclient()
     vector = vector[0]
-    res = client.search(collection_name=settings.qdrant_collection, query_vector=vector, limit=top_k, with_payload=True)
+    query_filter = build_filter(filters)
+    args = _hybrid_query(vector, query, top_k, query_filter) if (query and await _hybrid_available(client)) else None
+    res = None
+    if args is not None:
+        try:
+            res = (await client.query_points(collection_name=settings.qdrant_collection, limit=top_k,
+                                             with_payload=True, **args)).points
+        except Exception as e:
+            logger.warning("Hybrid search failed (%s); dense search for this request", e)
+    if res is None:
+        res = (await client.query_points(collection_name=settings.qdrant_collection, query=vector, query_filter=query_filter,
+                                         score_threshold=settings.score_threshold, search_params=_search_params(),
+                                         limit=top_k, with_payload=True)).points
     hits = []
     for h in res:
         hits.append({"id": str(h.id), "score": float(h.score), "payload": h.payload or {}})
     return hits
 
-# Simple tool registry
+MAX_TOOL_TOP_K = 50
+
+async def qdrant_search(query: str, top_k: Optional[int] = None, *, embed, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Tool wrapper: embed the model's query text, then search_qdrant."""
+    vector = await embed([query])
+    return await search_qdrant(vector, top_k=min(top_k or settings.top_k, MAX_TOOL_TOP_K), query=query, filters=filters)
+
+# Tool registry: name -> handler and JSON schema of the arguments the model may pass.
+# Handlers also receive keyword-only request context (embed, filters).
+# Names must match ^[a-zA-Z0-9_-]+$ for function calling.
 TOOLS = {
-    "qdrant.search": search_qdrant
+    "qdrant_search": {
+        "handler": qdrant_search,
+        "description": "Search the indexed meeting transcripts and documents for passages relevant to a query.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Search text: names, topics, ticket ids, ..."},
+                "top_k": {"type": "integer", "minimum": 1, "maximum": MAX_TOOL_TOP_K,
+                          "description": f"Number of passages to return (default {settings.top_k}, at most {MAX_TOOL_TOP_K})"},
+            },
+            "required": ["query"],
+        },
+    },
 }
+
+def tool_specs() -> List[Dict[str, Any]]:
+    """TOOLS in the function-calling format shared by OpenAI and Ollama /api/chat."""
+    return [{"type": "function", "function": {"name": name, "description": t["description"], "parameters": t["parameters"]}}
+            for name, t in TOOLS.items()]
+
+async def call_tool(name: str, args: Dict[str, Any], **context) -> Any:
+    """Run a tool call from the model. Unknown tools, unexpected arguments and
+    failures come back as {"error": ...} for the model to see."""
+    tool = TOOLS.get(name)
+    if tool is None:
+        return {"error": f"unknown tool {name!r}"}
+    allowed = tool["parameters"]["properties"]
+    missing = [k for k in tool["parameters"].get("required", []) if k not in (args or {})]
+    if missing:
+        return {"error": f"missing arguments: {', '.join(missing)}"}
+    try:
+        return await tool["handler"](**{k: v for k, v in (args or {}).items() if k in allowed}, **context)
+    except Exception as e:
+        logger.warning("Tool %s failed: %s", name, e)
+        return {"error": str(e)}
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.agent as agent
+from app.cache import AnswerCache
+from app.main import app
+
+HITS = [{"id": "1", "score": 0.9, "payload": {"text": "The budget review is on Friday.", "chunk_id": "m1#0", "doc_id": "m1"}}]
+
+
+class FakeEmbedder:
+    async def embed(self, texts):
+        return [[0.1, 0.2] for _ in texts]
+
+    async def aclose(self):
+        pass
+
+
+class FakeLLM:
+    async def stream_text(self, prompt):
+        for token in ["On ", "Friday."]:
+            yield token
+
+    async def simple_text(self, prompt):
+        return "On Friday."
+
+    async def chat(self, messages, tools=None, timeout=300):
+        return {"content": "On Friday.", "tool_calls": [], "message": {"role": "assistant", "content": "On Friday."}}
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def retrieve(query, qvec, max_context_items=None, filters=None):
+        return HITS
+
+    monkeypatch.setattr(agent, "embedder", FakeEmbedder())
+    monkeypatch.setattr(agent, "llm", FakeLLM())
+    monkeypatch.setattr(agent, "retrieve", retrieve)
+    monkeypatch.setattr(agent, "answer_cache", None)
+    return TestClient(app)
+
+
+def _events(body: str):
+    events = []
+    for block in body.replace("\r\n", "\n").strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) if ": " in line else (line.rstrip(":"), "") for line in block.split("\n"))
+        events.append((fields.get("event"), fields.get("data")))
+    return events
+
+
+@pytest.mark.parametrize("mode", [None, "retrieval_first", "react"])
+def test_chat_stream(client, mode):
+    body = {"query": "When is the budget review?", **({"mode": mode} if mode else {})}
+    r = client.post("/chat/stream", json=body)
+    assert r.status_code == 200
+    events = _events(r.text)
+    names = [e for e, _ in events]
+    assert names[0] == "retrieved" and names[-2:] == ["steps", "done"]
+    assert "".join(d for e, d in events if e == "message") == "On Friday."
+
+
+def test_chat_rejects_unknown_mode(client):
+    r = client.post("/chat", json={"query": "q", "mode": "reactt"})
+    assert r.status_code == 422
+
+
+class LoopingLLM(FakeLLM):
+    """Asks for another search every turn, never answers."""
+    async def chat(self, messages, tools=None, timeout=300):
+        call = {"id": "c1", "name": "qdrant_search", "arguments": {"query": "budget"}}
+        return {"content": "", "tool_calls": [call], "message": {"role": "assistant", "content": ""}}
+
+
+def test_react_tool_calls_are_bounded_by_the_time_budget_and_not_cached(client, monkeypatch):
+    async def slow_tool(name, arguments, **kwargs):
+        await asyncio.sleep(5)
+
+    cache = AnswerCache()
+    monkeypatch.setattr(agent, "llm", LoopingLLM())
+    monkeypatch.setattr(agent, "call_tool", slow_tool)
+    monkeypatch.setattr(agent, "answer_cache", cache)
+    monkeypatch.setattr(agent.settings, "agent_time_budget", 0.2)
+    t0 = time.monotonic()
+    r = client.post("/chat", json={"query": "When is the budget review?", "mode": "react"})
+    assert time.monotonic() - t0 < 2
+    assert r.status_code == 200 and r.json()["stopped"] is True
+    assert cache.stats()["size"] == 0
+
+
+def test_cached_answers_are_not_shared_across_modes(client, monkeypatch):
+    cache = AnswerCache()
+    monkeypatch.setattr(agent, "answer_cache", cache)
+    assert "cached" not in client.post("/chat", json={"query": "q", "mode": "retrieval_first"}).json()
+    assert "cached" not in client.post("/chat", json={"query": "q", "mode": "react"}).json()
+    assert client.post("/chat", json={"query": "q", "mode": "react"}).json()["cached"] is True
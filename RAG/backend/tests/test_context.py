@@ -0,0 +1,28 @@
+from app.context import build_context, merge_adjacent
+
+
+def _hit(cid, text, score):
+    doc = cid.split("#")[0]
+    return {"id": cid, "score": score, "payload": {"chunk_id": cid, "doc_id": doc, "text": text}}
+
+
+def test_over_budget_block_is_cut_with_the_given_counter():
+    words = lambda text: len(text.split())
+    text = " ".join(f"word{i}" for i in range(100))
+    ctx = build_context([_hit("d#0", text, 0.9)], max_tokens=10, count_tokens=words)
+    assert words(ctx) == 10
+
+
+def test_adjacent_chunks_are_merged_without_overlap():
+    a = "The budget review is on Friday. Sarah sends the numbers on Monday."
+    b = "Sarah sends the numbers on Monday. The launch moves to next week."
+    blocks = merge_adjacent([_hit("d#1", b, 0.8), _hit("d#0", a, 0.5)])
+    assert len(blocks) == 1
+    assert blocks[0].text == "The budget review is on Friday. Sarah sends the numbers on Monday. The launch moves to next week."
+    assert blocks[0].score == 0.8
+
+
+def test_near_duplicates_are_dropped():
+    text = "Sarah sends the revised budget numbers to the finance team on Monday morning."
+    ctx = build_context([_hit("a#0", text, 0.9), _hit("b#3", text + " Thanks.", 0.7)], max_tokens=1000)
+    assert ctx == text
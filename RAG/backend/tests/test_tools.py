@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+
+import app.tools as tools
+
+
+class FakeQdrant:
+    def __init__(self, sparse_vectors, fail_hybrid=0):
+        self.sparse_vectors = sparse_vectors
+        self.fail_hybrid = fail_hybrid
+        self.calls = []
+
+    async def get_collection(self, collection_name):
+        self.calls.append("info")
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(sparse_vectors=self.sparse_vectors)))
+
+    async def query_points(self, **kwargs):
+        # only named arguments of the real client (it also takes **kwargs)
+        assert set(kwargs) <= set(inspect.signature(AsyncQdrantClient.query_points).parameters) - {"kwargs"}
+        if "prefetch" not in kwargs:
+            self.calls.append("dense")
+            return SimpleNamespace(points=[SimpleNamespace(id=2, score=0.9, payload={"text": "dense"})])
+        self.calls.append("hybrid")
+        if self.fail_hybrid:
+            self.fail_hybrid -= 1
+            raise TimeoutError("timed out")
+        return SimpleNamespace(points=[SimpleNamespace(id=1, score=0.5, payload={"text": "hybrid"})])
+
+
+@pytest.fixture
+def qdrant(monkeypatch):
+    def make(**kwargs):
+        client = FakeQdrant(**kwargs)
+        monkeypatch.setattr(tools, "_get_qclient", lambda: client)
+        monkeypatch.setattr(tools, "_hybrid", None)
+        return client
+    return make
+
+
+def _search(query="ABC-123 budget"):
+    return asyncio.run(tools.search_qdrant([[0.1, 0.2]], top_k=3, query=query))
+
+
+def test_transient_hybrid_failure_only_affects_one_request(qdrant):
+    client = qdrant(sparse_vectors={"bm25": {}}, fail_hybrid=1)
+    assert _search()[0]["payload"]["text"] == "dense"
+    assert _search()[0]["payload"]["text"] == "hybrid"
+    assert client.calls == ["info", "hybrid", "dense", "hybrid"]
+
+
+def test_missing_sparse_vector_is_detected_once(qdrant):
+    client = qdrant(sparse_vectors=None)
+    _search()
+    _search()
+    assert client.calls == ["info", "dense", "dense"]
+
+
+def test_build_filter():
+    from app.schemas import SearchFilters
+    assert tools.build_filter(None) is None
+    f = tools.build_filter(SearchFilters(origin_id="m1", speaker=["Ann"], time_to=5).model_dump(exclude_none=True))
+    origin, speaker, time_range = f.must
+    assert origin.key == "origin_id" and origin.match.any == ["m1"]
+    assert {c.key for c in speaker.should} == {"speaker", "speakers"}
+    assert time_range.key == "timestamp" and time_range.range.lte == 5 and time_range.range.gte is None
+
+
+def test_call_tool_validates_arguments(monkeypatch):
+    seen = {}
+
+    async def search_qdrant(vector, top_k, query, filters):
+        seen.update(top_k=top_k, query=query, filters=filters)
+        return []
+
+    async def embed(texts):
+        return [[0.0]]
+
+    monkeypatch.setattr(tools, "search_qdrant", search_qdrant)
+    call = lambda name, args: asyncio.run(tools.call_tool(name, args, embed=embed, filters={"source": ["mised"]}))
+    assert call("nope", {}) == {"error": "unknown tool 'nope'"}
+    assert call("qdrant_search", {"top_k": 3}) == {"error": "missing arguments: query"}
+    # unknown arguments are dropped, top_k is capped
+    assert call("qdrant_search", {"query": "budget", "top_k": 500, "evil": 1}) == []
+    assert seen == {"top_k": tools.MAX_TOOL_TOP_K, "query": "budget", "filters": {"source": ["mised"]}}
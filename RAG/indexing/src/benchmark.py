@@ -0,0 +1,86 @@
+# src/benchmark.py
+"""Memory estimate, latency and recall@k of a collection's search settings
+against exact (brute-force) search, using the collection's own vectors as queries."""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import random
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qm
+
+
+@dataclass
+class BenchResult:
+    queries: int = 0
+    top_k: int = 0
+    recall: float = 0.0
+    latency_ms: Dict[str, float] = field(default_factory=dict)  # approx/exact p50/p95
+    memory: Dict[str, int] = field(default_factory=dict)  # estimated bytes per component
+
+
+def _dense(vector: Any) -> Optional[List[float]]:
+    # "" is the unnamed dense vector when the collection also has a sparse one
+    if isinstance(vector, dict):
+        vector = vector.get("")
+    return vector or None
+
+
+def estimate_memory(info: Any) -> Dict[str, int]:
+    """Rough RAM/disk footprint of the dense vectors and HNSW graph from the collection config."""
+    params = info.config.params
+    vectors = params.vectors
+    n = info.points_count or 0
+    dim = vectors.size
+    raw = n * dim * 4
+    on_disk = bool(getattr(vectors, "on_disk", False))
+    quant = getattr(vectors, "quantization_config", None) or info.config.quantization_config
+    m = (getattr(vectors, "hnsw_config", None) or info.config.hnsw_config).m or 16
+    out = {"vectors_ram": 0 if on_disk else raw, "vectors_disk": raw if on_disk else 0,
+           # layer 0 keeps up to 2*m links per point, 4 bytes each
+           "hnsw_graph": n * m * 2 * 4}
+    if isinstance(quant, qm.ScalarQuantization):
+        key = "quantized_ram" if quant.scalar.always_ram is not False else "quantized_disk"
+        out[key] = n * dim
+    elif isinstance(quant, qm.BinaryQuantization):
+        key = "quantized_ram" if quant.binary.always_ram is not False else "quantized_disk"
+        out[key] = n * ((dim + 7) // 8)
+    return out
+
+
+def sample_query_vectors(client: QdrantClient, collection: str, n: int, seed: int = 0) -> List[List[float]]:
+    """`n` stored vectors picked at random from the first 10*n points."""
+    points, _ = client.scroll(collection_name=collection, limit=n * 10, with_vectors=True, with_payload=False)
+    vectors = [v for v in (_dense(p.vector) for p in points) if v]
+    random.Random(seed).shuffle(vectors)
+    return vectors[:n]
+
+
+def _timed_search(client: QdrantClient, collection: str, vector: List[float], top_k: int,
+                  params: qm.SearchParams) -> tuple:
+    t0 = time.perf_counter()
+    hits = client.query_points(collection_name=collection, query=vector, limit=top_k,
+                               search_params=params, with_payload=False).points
+    return (time.perf_counter() - t0) * 1000, [h.id for h in hits]
+
+
+def run_benchmark(client: QdrantClient, collection: str, queries: List[List[float]], top_k: int,
+                  params: qm.SearchParams) -> BenchResult:
+    exact = qm.SearchParams(exact=True)
+    approx_ms, exact_ms, recalls = [], [], []
+    for vector in queries:
+        t_approx, got = _timed_search(client, collection, vector, top_k, params)
+        t_exact, truth = _timed_search(client, collection, vector, top_k, exact)
+        approx_ms.append(t_approx)
+        exact_ms.append(t_exact)
+        if truth:
+            recalls.append(len(set(got) & set(truth)) / len(truth))
+    res = BenchResult(queries=len(queries), top_k=top_k, recall=float(np.mean(recalls)) if recalls else 0.0,
+                      memory=estimate_memory(client.get_collection(collection_name=collection)))
+    for name, ms in (("approx", approx_ms), ("exact", exact_ms)):
+        if ms:
+            res.latency_ms[f"{name}_p50"] = float(np.percentile(ms, 50))
+            res.latency_ms[f"{name}_p95"] = float(np.percentile(ms, 95))
+    return res
@@ -0,0 +1,74 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, List, Sequence
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by sha256(model + text), vectors stored as float32.
+
+    Bounded by `max_entries`; the least recently used rows are evicted in bulk
+    once the bound is exceeded.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used);
+        """)
+        self._count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part).fetchall()
+                found.update((k, array("f", v).tolist()) for k, v in rows)
+            now = time.time()
+            self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self._db.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, array("f", v).tobytes(), now) for k, v in items.items()])
+            self._count += self._db.total_changes - before
+            if self._count > self.max_entries:
+                # evict down to 90% so eviction doesn't run on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,))
+                self._count -= excess
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,6 +1,9 @@
 
 from __future__ import annotations
-from typing import List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from bisect import bisect_right
+from collections import deque
+import re
 
 def chunk_text(text: str, max_chars: int = 2000, overlap: int = 250) -> List[str]:
     text = text or ""
@@ -14,3 +17,142 @@ def chunk_text(text: str, max_chars: int = 2000, overlap: int = 250) -> List[str
             break
         i = max(0, end - overlap)
     return chunks
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], max_chars: int = 2000, overlap: int = 250) -> Iterator[Tuple[str, int, int]]:
+    """Streaming variant of chunk_text for paged documents.
+
+    Consumes (page_no, text) pairs incrementally and yields
+    (chunk, page_start, page_end), holding at most about one chunk plus one
+    page in memory. Pages are joined with newlines, as in chunk_text input.
+    """
+    buf = ""
+    starts: List[int] = []  # offset in buf where each tracked page begins
+    nums: List[int] = []
+
+    def page_at(offset: int) -> int:
+        return nums[max(0, bisect_right(starts, offset) - 1)]
+
+    def span(chunk: str) -> Tuple[str, int, int]:
+        # page separators at either edge don't count towards the page range
+        first = len(chunk) - len(chunk.lstrip("\n"))
+        last = max(first, len(chunk.rstrip("\n")) - 1)
+        return chunk, page_at(first), page_at(last)
+
+    for page_no, text in pages:
+        if not text or not text.strip():
+            continue
+        if buf:
+            buf += "\n"
+        starts.append(len(buf))
+        nums.append(page_no)
+        buf += text
+        while len(buf) > max_chars:
+            yield span(buf[:max_chars])
+            drop = max_chars - overlap
+            buf = buf[drop:]
+            # keep the page covering the new offset 0, rebase the rest
+            keep = max(0, bisect_right(starts, drop) - 1)
+            starts = [max(0, o - drop) for o in starts[keep:]]
+            nums = nums[keep:]
+    if buf:
+        yield span(buf)
+
+
+# sentence ends (followed by whitespace) and line breaks; transcripts put one utterance per line
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate (~4 characters per token for English BPE vocabularies)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def load_token_counter(tokenizer: Optional[str] = None) -> Callable[[str], int]:
+    """Exact counter from a Hugging Face `tokenizers` model, or the estimate when unset."""
+    if not tokenizer:
+        return estimate_tokens
+    from tokenizers import Tokenizer
+    tok = Tokenizer.from_pretrained(tokenizer)
+    return lambda text: len(tok.encode(text, add_special_tokens=False).ids)
+
+
+def _split_long(sentence: str, max_tokens: int, count_tokens: Callable[[str], int]) -> Iterator[Tuple[str, int]]:
+    """Cut a sentence over budget into parts of at most `max_tokens` by
+    `count_tokens`, on whitespace where possible. The longest prefix within
+    budget is found by search on its length, since token counts need not
+    track characters (and a single character can exceed the budget)."""
+    rest = sentence
+    while rest:
+        # grow an upper bound from the ~4 chars/token estimate, then bisect
+        hi = min(len(rest), max(1, max_tokens) * 4)
+        while hi < len(rest) and count_tokens(rest[:hi]) <= max_tokens:
+            hi = min(len(rest), hi * 2)
+        lo = 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if count_tokens(rest[:mid]) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        end = lo
+        if end < len(rest):
+            space = rest.rfind(" ", 1, end + 1)
+            end = space if space > 0 else end
+        part = rest[:end].strip()
+        rest = rest[end:].lstrip()
+        if part:
+            yield part, count_tokens(part)
+
+
+def chunk_sentences(segments: Iterable[Tuple[Any, str]], max_tokens: int = 512, overlap_tokens: int = 64,
+                    count_tokens: Callable[[str], int] = estimate_tokens) -> Iterator[Tuple[str, Any, Any]]:
+    """Pack sentences into chunks of at most `max_tokens` in one linear pass.
+
+    `segments` are (tag, text) pairs, e.g. (page_no, page_text); each chunk is
+    yielded as (text, first_tag, last_tag). Chunks break only between
+    sentences (overlong sentences are cut on whitespace) and the next chunk
+    starts with the trailing sentences of the previous one, up to
+    `overlap_tokens`.
+    """
+    window: deque = deque()  # (sentence, tag, tokens)
+    size = 0
+    fresh = False  # window holds sentences not emitted yet
+    for tag, text in segments:
+        for sentence in _SENTENCE_BREAK.split(text or ""):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            n = count_tokens(sentence)
+            parts = _split_long(sentence, max_tokens, count_tokens) if n > max_tokens else ((sentence, n),)
+            for part, n in parts:
+                if fresh and size + n > max_tokens:
+                    yield " ".join(w[0] for w in window), window[0][1], window[-1][1]
+                    while window and (size > overlap_tokens or size + n > max_tokens):
+                        size -= window.popleft()[2]
+                    fresh = False
+                window.append((part, tag, n))
+                size += n
+                fresh = True
+    if fresh:
+        yield " ".join(w[0] for w in window), window[0][1], window[-1][1]
+
+
+def make_chunker(conf) -> Callable[[Dict[str, Any]], Iterator[Tuple[str, Any, Any]]]:
+    """Build the item chunker selected by the `chunking` config section.
+
+    The returned callable maps a loader item (with "text" or "pages") to
+    (chunk, page_start, page_end) triples; page fields are None for plain text.
+    """
+    if conf.mode == "chars":
+        def chunk(item):
+            if "pages" in item:
+                return chunk_pages(item["pages"], conf.max_chars, conf.overlap)
+            return ((c, None, None) for c in chunk_text(item["text"], conf.max_chars, conf.overlap))
+        return chunk
+    if conf.mode != "sentence":
+        raise ValueError(f"chunking.mode must be 'sentence' or 'chars', got {conf.mode!r}")
+    count_tokens = load_token_counter(conf.tokenizer)
+    def chunk(item):
+        segments = item["pages"] if "pages" in item else [(None, item["text"])]
+        return chunk_sentences(segments, conf.max_tokens, conf.overlap_tokens, count_tokens)
+    return chunk
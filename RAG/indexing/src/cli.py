@@ -1,22 +1,45 @@
 
 from __future__ import annotations
-import click, os, sys, math
-from typing import List, Dict, Any
-from tqdm import tqdm
+import click, os, sys, math, json, random, time
+from typing import Iterable, Dict, Any, List, Optional, Tuple
 from qdrant_client import QdrantClient
 from .settings import load_settings
-from .chunking import chunk_text
 from .embeddings import Embedder, EmbeddingBackend
-from .indexer import ensure_collection, upsert_points
-from .loaders.mised_loader import load_mised_segments
-from .loaders.docs_loader import iter_docs
+from .cache import EmbeddingCache
+from .indexer import ensure_collection, upsert_points, delete_points, consistency_barrier, _get_expected_dim, search_params
+from .benchmark import sample_query_vectors, run_benchmark
+from .manifest import Manifest
+from .sparse import encode_document
+from .journal import IngestJournal, ResumeState
+from .chunking import make_chunker
+from .pipeline import PipelineStats, iter_chunks, skip_unchanged, iter_batches, run_pipeline, record_upserted
+from .loaders.mised_loader import (load_mised_segments, load_mised_windows, TranscriptCleaner,
+                                   clean_text, is_useless_chunk, iter_jsonl_records)
+from .loaders.docs_loader import iter_docs, ExtractStats
 
 def _make_embedder(cfg):
     name = cfg.embeddings.backend
     if name not in ("ollama","sentence_transformers"):
         raise SystemExit("embeddings.backend must be 'ollama' or 'sentence_transformers'")
     backend = EmbeddingBackend(name=name, model=cfg.embeddings.model, st_model=cfg.embeddings.st_model)
-    return Embedder(backend)
+    cache = EmbeddingCache(cfg.embeddings.cache_path, cfg.embeddings.cache_max_entries) if cfg.embeddings.cache_path else None
+    return Embedder(backend, ollama_url=cfg.embeddings.ollama_url,
+                    batch_size=cfg.embeddings.batch_size, timeout=cfg.embeddings.timeout, cache=cache)
+
+def _make_client(cfg) -> QdrantClient:
+    return QdrantClient(url=cfg.qdrant.url, api_key=cfg.qdrant.api_key,
+                        prefer_grpc=cfg.qdrant.prefer_grpc, grpc_port=cfg.qdrant.grpc_port)
+
+def _ensure_collection(cfg, client: QdrantClient, vector_size: int) -> Tuple[bool, bool]:
+    ix = cfg.index
+    return ensure_collection(client, cfg.qdrant.collection, vector_size, distance="Cosine",
+                             sparse_vector=cfg.sparse.vector_name if cfg.sparse.enabled else None,
+                             on_disk_vectors=ix.on_disk_vectors, on_disk_payload=ix.on_disk_payload,
+                             hnsw_m=ix.hnsw_m, hnsw_ef_construct=ix.hnsw_ef_construct,
+                             quantization=ix.quantization, quantization_always_ram=ix.quantization_always_ram)
+
+def _manifest_path(cfg) -> str:
+    return os.path.join(cfg.ingestion.manifest_dir, f"{cfg.qdrant.collection}.sqlite")
 
 @click.group()
 def cli():
@@ -31,81 +54,200 @@ def show_config():
 @click.option("--vector-size", default=768, show_default=True, help="Embedding dimension (768 for nomic-embed-text; 384 for MiniLM)")
 def create_collection(vector_size: int):
     cfg = load_settings()
-    client = QdrantClient(url=cfg.qdrant.url, api_key=cfg.qdrant.api_key)
-    ensure_collection(client, cfg.qdrant.collection, vector_size, distance="Cosine")
-    click.secho(f"Ensured collection '{cfg.qdrant.collection}' (size={vector_size})", fg="green")
+    client = _make_client(cfg)
+    created, sparse_ok = _ensure_collection(cfg, client, vector_size)
+    if created:
+        # a dropped and recreated collection holds none of the chunks the manifest lists
+        manifest = Manifest(_manifest_path(cfg))
+        manifest.clear()
+        manifest.close()
+    click.secho(f"Ensured collection '{cfg.qdrant.collection}' (size={vector_size}"
+                f"{', sparse=' + cfg.sparse.vector_name if sparse_ok else ''})", fg="green")
+
+def _check_full(full: bool, resume: bool):
+    if full and resume:
+        raise click.UsageError("--full and --resume cannot be combined")
+
+def _open_journal(cfg, command: str, source_input: str, resume: bool):
+    """Journal for this command + input, and the interrupted run to resume (if any)."""
+    journal = IngestJournal(cfg.ingestion.journal_dir, command, source_input)
+    state = journal.resume_state() if resume else None
+    if resume and state is None:
+        click.secho("Nothing to resume: no interrupted run in the journal, starting fresh", fg="yellow")
+    elif state is not None:
+        click.secho(f"Resuming run {state.run_id[:8]}: {len(state.done_keys)} items and "
+                    f"{state.upserted_batches} batches already indexed", fg="cyan")
+    return journal, state
 
-def _pipeline(items: List[Dict[str,Any]]):
+def _pipeline(items: Iterable[Any], source: str, prune: bool = False,
+              journal: Optional[IngestJournal] = None, resume: Optional[ResumeState] = None, full: bool = False):
     cfg = load_settings()
     embedder = _make_embedder(cfg)
-    client = QdrantClient(url=cfg.qdrant.url, api_key=cfg.qdrant.api_key)
+    client = _make_client(cfg)
 
     # Detect vector size (simple heuristic)
     vec_size = 768 if cfg.embeddings.backend == "ollama" else (384 if "MiniLM" in cfg.embeddings.st_model else 768)
-    ensure_collection(client, cfg.qdrant.collection, vec_size, distance="Cosine")
-
-    payloads: List[Dict[str,Any]] = []
-    texts: List[str] = []
-    ids: List[str] = []
-
-    for it in items:
-        chunks = chunk_text(it["text"], cfg.chunking.max_chars, cfg.chunking.overlap)
-        for idx, ch in enumerate(chunks):
-            cid = f"{it['doc_id']}#{idx}"
-            payloads.append({
-                "chunk_id": cid,
-                "doc_id": it["doc_id"],
-                "source": it.get("source"),
-                "origin_id": it.get("origin_id"),
-                "title": it.get("title"),
-                "speaker": it.get("speaker"),
-                "timestamp": it.get("timestamp"),
-                "text": ch
-            })
-            texts.append(ch)
-            ids.append(cid)
-
-    if not payloads:
+    created, use_sparse = _ensure_collection(cfg, client, vec_size)
+    if created and resume is not None:
+        if journal is not None:
+            journal.close()
+        raise click.ClickException(f"Collection '{cfg.qdrant.collection}' did not exist, so the interrupted run's "
+                                   "chunks are not in it; run again without --resume")
+    # resolve once instead of a get_collection round trip per upsert batch
+    expected_dim = _get_expected_dim(client, cfg.qdrant.collection, fallback=vec_size)
+
+    # resuming keeps the interrupted run's id, so chunks it already indexed are
+    # not stale and --prune stays correct
+    manifest = Manifest(_manifest_path(cfg), run_id=resume.run_id if resume else None)
+    if created:
+        # a dropped and recreated collection holds none of the chunks the manifest lists
+        manifest.clear()
+    stats = PipelineStats()
+    if journal is not None:
+        journal.start(manifest.run_id, resumed=resume is not None)
+
+    def upsert(b):
+        sparse = [encode_document(t, k1=cfg.sparse.k1, b=cfg.sparse.b, avg_doc_len=cfg.sparse.avg_doc_len)
+                  for t in b.texts] if use_sparse else None
+        # wait=False: acknowledged once in Qdrant's WAL; consistency_barrier below
+        upserted, skipped, accepted = upsert_points(client, cfg.qdrant.collection, b.vectors, b.payloads, b.ids,
+                                                    expected_dim=expected_dim, batch_wait=False,
+                                                    l2_normalize=cfg.embeddings.normalize,
+                                                    retries=cfg.ingestion.upsert_retries,
+                                                    sparse=sparse, sparse_name=cfg.sparse.vector_name)
+        record_upserted(manifest, b, accepted)
+        return upserted, skipped
+
+    # load -> chunk -> skip unchanged -> embed batch -> upsert batch, streamed end
+    # to end; embedding and upserting run concurrently
+    try:
+        chunks = iter_chunks(items, make_chunker(cfg.chunking))
+        # the sparse vector is part of what gets indexed: chunks indexed
+        # dense-only are re-upserted once it is enabled
+        index_key = f"{cfg.embeddings.model}+{cfg.sparse.vector_name}" if use_sparse else cfg.embeddings.model
+        changed = skip_unchanged(chunks, manifest, index_key, counter=stats, force=full)
+        batches = iter_batches(changed, cfg.embeddings.batch_size)
+        run_pipeline(
+            batches,
+            embed=embedder.embed,
+            upsert=upsert,
+            embed_workers=cfg.ingestion.embed_workers,
+            upsert_workers=cfg.ingestion.upsert_workers,
+            max_in_flight=cfg.ingestion.max_in_flight,
+            stats=stats,
+            on_checkpoint=(lambda cp: journal.checkpoint(cp.offset, cp.key)) if journal else None,
+            on_batch=(lambda stage, seq, b: journal.batch(stage, seq, len(b.texts))) if journal else None,
+        )
+        consistency_barrier(client, cfg.qdrant.collection)
+        stale = manifest.stale(prune_source=source if prune else None)
+        stats.deleted = delete_points(client, cfg.qdrant.collection, stale)
+        manifest.forget(stale)
+        if journal is not None:
+            journal.complete(stats.__dict__)
+    finally:
+        manifest.close()
+        if journal is not None:
+            journal.close()
+
+    if not (stats.embedded or stats.unchanged or stats.deleted):
         click.secho("No text to index.", fg="yellow")
         return
+    if embedder.cache is not None:
+        click.secho(f"Embedding cache: {embedder.cache.hits} hits, {embedder.cache.misses} misses", fg="cyan")
+    click.secho(f"Indexed {stats.upserted} chunks into '{cfg.qdrant.collection}' "
+                f"(unchanged {stats.unchanged}, deleted {stats.deleted}, skipped {stats.skipped})", fg="green")
 
-    # Embed in batches
-    B = 64
-    vectors: List[List[float]] = []
-    for i in tqdm(range(0, len(texts), B), desc="Embedding"):
-        batch = texts[i:i+B]
-        vecs = embedder.embed(batch)
-        vectors.extend(vecs)
+@cli.command()
+@click.option("--jsonl", required=True, help="Path or URL to MISeD JSONL (.gz/.zst supported)")
+@click.option("--prune", is_flag=True, help="Delete indexed MISeD chunks that are no longer in the input")
+@click.option("--resume", is_flag=True, help="Continue the last interrupted run for this input from its journal")
+@click.option("--full", is_flag=True, help="Re-upsert every chunk, ignoring the manifest (e.g. after the collection was recreated elsewhere)")
+def ingest_mised(jsonl: str, prune: bool, resume: bool, full: bool):
+    _check_full(full, resume)
+    cfg = load_settings()
+    cleaner = _make_cleaner(cfg)
+    journal, state = _open_journal(cfg, "ingest-mised", jsonl, resume)
+    offset = state.offset if state else 0
+    if offset:
+        click.secho(f"Skipping to byte {offset} (after meeting {state.last_key})", fg="cyan")
+    if cfg.mised.mode == "segment":
+        items = load_mised_segments(jsonl, cleaner=cleaner, offset=offset, checkpoints=True)
+    else:
+        items = load_mised_windows(jsonl, max_chars=cfg.mised.window_max_chars,
+                                   max_seconds=cfg.mised.window_max_seconds, max_turns=cfg.mised.window_max_turns,
+                                   cleaner=cleaner, offset=offset, checkpoints=True)
+    _pipeline(items, source="mised", prune=prune, journal=journal, resume=state, full=full)
+    click.secho(f"Transcript cleaning: {cleaner.summary()}", fg="cyan")
 
-    # Upsert in batches
-    U = 256
-    for i in tqdm(range(0, len(vectors), U), desc="Upserting"):
-        upsert_points(client, cfg.qdrant.collection, vectors[i:i+U], payloads[i:i+U], ids[i:i+U])
+def _make_cleaner(cfg) -> TranscriptCleaner:
+    return TranscriptCleaner(cfg.mised.filler_phrases, cfg.mised.short_fillers)
 
-    click.secho(f"Indexed {len(vectors)} chunks into '{cfg.qdrant.collection}'", fg="green")
+def _bench_segments(jsonl: Optional[str], n: int) -> List[str]:
+    if jsonl:
+        texts = []
+        for _, line in iter_jsonl_records(jsonl):
+            try:
+                segs = (json.loads(line).get("meeting") or {}).get("transcriptSegments") or []
+            except ValueError:
+                continue
+            texts.extend(s.get("text", "") for s in segs)
+        return texts
+    rnd = random.Random(0)
+    samples = ["Mm hmm.", "Yeah.", "Okay, so uh the budget review is due on Friday.",
+               "um I think we should, uh, move the launch to next week", "...", "Thank you, bye!",
+               "Alright.", "So the action item for Sarah is to send the revised numbers by Monday morning."]
+    return [rnd.choice(samples) for _ in range(n)]
 
 @cli.command()
-@click.option("--jsonl", required=True, help="Path or URL to MISeD JSONL")
-def ingest_mised(jsonl: str):
-    items = list(load_mised_segments(jsonl))
-    click.secho(f"Loaded {len(items)} MISeD segments", fg="cyan")
-    _pipeline(items)
+@click.option("--jsonl", default=None, help="Benchmark on this MISeD JSONL instead of synthetic segments")
+@click.option("--segments", default=200_000, show_default=True, help="Number of synthetic segments")
+def bench_clean(jsonl: Optional[str], segments: int):
+    """Compare segments/sec of the legacy clean_text+is_useless_chunk path and TranscriptCleaner."""
+    texts = _bench_segments(jsonl, segments)
+    t0 = time.perf_counter()
+    legacy_kept = 0
+    for t in texts:
+        c = clean_text(t.strip())
+        if c and not is_useless_chunk(c):
+            legacy_kept += 1
+    legacy = time.perf_counter() - t0
+    cleaner = _make_cleaner(load_settings())
+    t0 = time.perf_counter()
+    for t in texts:
+        cleaner.clean(t)
+    fast = time.perf_counter() - t0
+    click.echo(f"segments:         {len(texts)}")
+    click.echo(f"legacy:           {len(texts) / legacy:,.0f} segments/s (kept {legacy_kept})")
+    click.echo(f"TranscriptCleaner: {len(texts) / fast:,.0f} segments/s ({cleaner.summary()})")
+    click.echo(f"speedup:          {legacy / fast:.2f}x")
 
 @cli.command()
 @click.option("--path", required=True, type=click.Path(exists=True, file_okay=False), help="Folder containing PDFs/DOCX")
-def ingest_docs(path: str):
-    items = list(iter_docs(path))
-    click.secho(f"Loaded {len(items)} documents", fg="cyan")
-    _pipeline(items)
+@click.option("--prune", is_flag=True, help="Delete indexed documents that are no longer in the folder")
+@click.option("--workers", type=int, default=None, help="Parallel extraction processes (default: ingestion.extract_workers)")
+@click.option("--resume", is_flag=True, help="Continue the last interrupted run for this folder from its journal")
+@click.option("--full", is_flag=True, help="Re-upsert every chunk, ignoring the manifest (e.g. after the collection was recreated elsewhere)")
+def ingest_docs(path: str, prune: bool, workers: Optional[int], resume: bool, full: bool):
+    _check_full(full, resume)
+    cfg = load_settings()
+    workers = cfg.ingestion.extract_workers if workers is None else workers
+    journal, state = _open_journal(cfg, "ingest-docs", path, resume)
+    extract_stats = ExtractStats()
+    docs = iter_docs(path, workers=workers, timeout=cfg.ingestion.extract_timeout, stats=extract_stats,
+                     skip=state.done_keys if state else None, checkpoints=True)
+    _pipeline(docs, source="drive", prune=prune, journal=journal, resume=state, full=full)
+    problems = extract_stats.failed or extract_stats.timed_out or extract_stats.partial
+    click.secho(extract_stats.summary(), fg="yellow" if problems else "cyan")
 
 @cli.command()
 @click.option("--query", required=True, help="Search query to embed and use against Qdrant")
 def search(query: str):
     cfg = load_settings()
     embedder = _make_embedder(cfg)
-    client = QdrantClient(url=cfg.qdrant.url, api_key=cfg.qdrant.api_key)
+    client = _make_client(cfg)
     qvec = embedder.embed([query])[0]
-    res = client.search(collection_name=cfg.qdrant.collection, query_vector=qvec, limit=5, with_payload=True)
+    res = client.search(collection_name=cfg.qdrant.collection, query_vector=qvec, limit=5, with_payload=True,
+                        search_params=_search_params(cfg))
     for hit in res:
         score = hit.score
         payload = hit.payload or {}
@@ -113,5 +255,32 @@ def search(query: str):
         text = (payload.get("text") or "")[:160].replace("\n"," ")
         print(f"[{score:.3f}] {title} :: {text}")
 
+def _search_params(cfg):
+    return search_params(cfg.index.search_hnsw_ef, cfg.index.search_rescore, cfg.index.search_oversampling)
+
+@cli.command()
+@click.option("--queries", default=100, show_default=True, help="Number of stored vectors used as queries")
+@click.option("--top-k", default=10, show_default=True)
+@click.option("--hnsw-ef", type=int, default=None, help="Override index.search_hnsw_ef")
+@click.option("--oversampling", type=float, default=None, help="Override index.search_oversampling")
+def benchmark(queries: int, top_k: int, hnsw_ef: Optional[int], oversampling: Optional[float]):
+    """Estimated memory, search latency and recall@k against exact search."""
+    cfg = load_settings()
+    client = _make_client(cfg)
+    params = search_params(hnsw_ef or cfg.index.search_hnsw_ef, cfg.index.search_rescore,
+                           oversampling or cfg.index.search_oversampling)
+    vectors = sample_query_vectors(client, cfg.qdrant.collection, queries)
+    if not vectors:
+        click.secho("Collection is empty.", fg="yellow")
+        return
+    res = run_benchmark(client, cfg.qdrant.collection, vectors, top_k, params)
+    click.echo(f"queries: {res.queries}, top_k: {res.top_k}, hnsw_ef: {params.hnsw_ef}, "
+               f"rescore: {params.quantization.rescore}, oversampling: {params.quantization.oversampling}")
+    for key, size in res.memory.items():
+        click.echo(f"  {key:<15} {size / 2**20:10.1f} MiB (estimated)")
+    click.echo(f"latency approx: p50 {res.latency_ms['approx_p50']:.2f} ms, p95 {res.latency_ms['approx_p95']:.2f} ms")
+    click.echo(f"latency exact:  p50 {res.latency_ms['exact_p50']:.2f} ms, p95 {res.latency_ms['exact_p95']:.2f} ms")
+    click.secho(f"recall@{top_k}: {res.recall:.3f}", fg="green" if res.recall >= 0.95 else "yellow")
+
 if __name__ == "__main__":
     cli()
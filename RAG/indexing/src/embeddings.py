@@ -1,8 +1,12 @@
-
 from __future__ import annotations
 from typing import List, Literal, Optional
 from dataclasses import dataclass
+import logging
+import threading
 import requests
+from .cache import EmbeddingCache, text_key
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class EmbeddingBackend:
@@ -11,29 +15,88 @@ class EmbeddingBackend:
     st_model: Optional[str] = None
 
 class Embedder:
-    def __init__(self, backend: EmbeddingBackend, ollama_url: str = "http://localhost:11434"):
+    def __init__(self, backend: EmbeddingBackend, ollama_url: str = "http://localhost:11434",
+                 batch_size: int = 64, timeout: float = 60.0, cache: Optional[EmbeddingCache] = None):
         self.backend = backend
+        self.cache = cache
         self.ollama_url = ollama_url
+        self.max_batch_size = max(1, batch_size)
+        self.batch_size = self.max_batch_size
+        self.timeout = timeout
+        self._ok_streak = 0
+        self._adapt_lock = threading.Lock()  # batch_size/_ok_streak are shared by embed worker threads
+        self._local = threading.local()
         self._st = None
         if self.backend.name == "sentence_transformers":
             from sentence_transformers import SentenceTransformer
             model_name = self.backend.st_model or "sentence-transformers/all-MiniLM-L6-v2"
             self._st = SentenceTransformer(model_name)
 
+    def _session(self) -> requests.Session:
+        # one keep-alive session per embedding worker thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _ollama_embed(self, texts: List[str]) -> List[List[float]]:
+        r = self._session().post(f"{self.ollama_url}/api/embed",
+            headers={"Content-Type": "application/json"},
+            json={
+                "model": self.backend.model,
+                "input": texts
+            }, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()["embeddings"]
+
+    @property
+    def model_name(self) -> str:
+        return self.backend.model if self.backend.name == "ollama" else (self.backend.st_model or "")
+
     def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, serving byte-identical texts from the on-disk cache when configured."""
+        if self.cache is None:
+            return self._embed(texts)
+        keys = [text_key(self.model_name, t) for t in texts]
+        found = self.cache.get_many(keys)
+        missing: dict = {}
+        for i, k in enumerate(keys):
+            if k not in found and k not in missing:
+                missing[k] = i
+        if missing:
+            fresh = self._embed([texts[i] for i in missing.values()])
+            new = dict(zip(missing, fresh))
+            self.cache.put_many(new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
         if self.backend.name == "ollama":
-            # Batch through Ollama
-            vecs = []
-            for t in texts:
-                r = requests.post(f"{self.ollama_url}/api/embed", 
-                headers={"Content-Type": "application/json"},
-                json={
-                    "model": self.backend.model,
-                    "input": t
-                }, timeout=60)
-                r.raise_for_status()
-                vecs.append(r.json()["embeddings"])
-            
+            # One /api/embed request per batch; halve the batch on timeouts and
+            # grow it back after a run of successful requests.
+            vecs: List[List[float]] = []
+            i = 0
+            while i < len(texts):
+                with self._adapt_lock:
+                    size = self.batch_size
+                batch = texts[i:i + size]
+                try:
+                    vecs.extend(self._ollama_embed(batch))
+                except requests.Timeout:
+                    if len(batch) == 1:
+                        raise
+                    with self._adapt_lock:
+                        # relative to the size that timed out, so concurrent timeouts halve once
+                        self.batch_size = max(1, min(self.batch_size, len(batch) // 2))
+                        self._ok_streak = 0
+                        logger.warning("Embedding request timed out; batch size reduced to %d", self.batch_size)
+                    continue
+                i += len(batch)
+                with self._adapt_lock:
+                    self._ok_streak += 1
+                    if self._ok_streak >= 8 and self.batch_size < self.max_batch_size:
+                        self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                        self._ok_streak = 0
             return vecs
         else:
-            return self._st.encode(texts, normalize_embeddings=True).tolist()
+            return self._st.encode(texts, batch_size=self.batch_size, normalize_embeddings=True).tolist()
@@ -3,6 +3,9 @@ from __future__ import annotations
 from typing import Dict, Any, List, Optional, Tuple
 import uuid
 import logging
+import time
+
+import numpy as np
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qm
@@ -11,6 +14,14 @@ from qdrant_client.http.models import PointStruct
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# namespace for deterministic point ids derived from chunk ids
+POINT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "meeting-rag/chunk")
+
+
+def point_id(chunk_id: str) -> str:
+    """Stable Qdrant point id for a chunk id, so re-indexing overwrites in place."""
+    return str(uuid.uuid5(POINT_NAMESPACE, str(chunk_id)))
+
 
 def _get_expected_dim(client: QdrantClient, collection: str, fallback: Optional[int] = None) -> Optional[int]:
     """Try to read vector size from collection metadata. Return fallback if unavailable."""
@@ -94,18 +105,116 @@ def _normalize_vector(v: Any, expected_dim: Optional[int] = None) -> Optional[Li
     return None
 
 
-def ensure_collection(client: QdrantClient, name: str, vector_size: int, distance: str = "COSINE"):
+def _to_matrix(vectors: List[Any], expected_dim: Optional[int] = None) -> Optional[np.ndarray]:
+    """Fast path: convert a whole batch of well-formed embeddings into one
+    contiguous float32 matrix (n, dim). Also accepts the (n, 1, dim) shape
+    produced by per-text Ollama calls. Returns None when the batch is ragged,
+    contains dicts/non-numbers or has the wrong dimension, so the caller can
+    fall back to `_normalize_vector` per element.
+    """
+    if not vectors:
+        return None
+    try:
+        m = np.asarray(vectors, dtype=np.float32)
+    except (ValueError, TypeError):
+        return None
+    if m.ndim == 3 and m.shape[1] == 1:
+        m = m[:, 0, :]
+    if m.ndim != 2 or m.shape[0] != len(vectors) or m.shape[1] == 0:
+        return None
+    if expected_dim and m.shape[1] != expected_dim:
+        return None
+    return np.ascontiguousarray(m)
+
+
+def _l2_normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    return np.divide(m, norms, out=np.zeros_like(m), where=norms > 0)
+
+
+# payload fields the backend filters on, and their index types
+PAYLOAD_INDEXES = {
+    "origin_id": qm.PayloadSchemaType.KEYWORD,
+    "doc_id": qm.PayloadSchemaType.KEYWORD,
+    "source": qm.PayloadSchemaType.KEYWORD,
+    "speaker": qm.PayloadSchemaType.KEYWORD,
+    "speakers": qm.PayloadSchemaType.KEYWORD,
+    "timestamp": qm.PayloadSchemaType.INTEGER,
+}
+
+
+def ensure_payload_indexes(client: QdrantClient, name: str, existing: Optional[Dict[str, Any]] = None):
+    """Create the PAYLOAD_INDEXES missing from the collection, so filtered
+    searches use the index instead of scanning every point."""
+    existing = existing or {}
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(collection_name=name, field_name=field_name, field_schema=schema, wait=True)
+        logger.info("Created %s payload index on '%s'.", schema.value, field_name)
+
+
+def _sparse_names(info: Any) -> List[str]:
+    params = getattr(getattr(info, "config", None), "params", None)
+    return list(getattr(params, "sparse_vectors", None) or {})
+
+
+def quantization_config(kind: Optional[str], always_ram: bool = True) -> Optional[Any]:
+    if not kind:
+        return None
+    if kind == "scalar":
+        return qm.ScalarQuantization(scalar=qm.ScalarQuantizationConfig(type=qm.ScalarType.INT8, always_ram=always_ram))
+    if kind == "binary":
+        return qm.BinaryQuantization(binary=qm.BinaryQuantizationConfig(always_ram=always_ram))
+    raise ValueError(f"quantization must be 'scalar' or 'binary', got {kind!r}")
+
+
+def search_params(hnsw_ef: Optional[int] = None, rescore: bool = True, oversampling: Optional[float] = None,
+                  exact: bool = False) -> qm.SearchParams:
+    return qm.SearchParams(hnsw_ef=hnsw_ef, exact=exact,
+                           quantization=qm.QuantizationSearchParams(rescore=rescore, oversampling=oversampling))
+
+
+def ensure_collection(client: QdrantClient, name: str, vector_size: int, distance: str = "COSINE",
+                      sparse_vector: Optional[str] = None, on_disk_vectors: bool = False, on_disk_payload: bool = False,
+                      hnsw_m: Optional[int] = None, hnsw_ef_construct: Optional[int] = None,
+                      quantization: Optional[str] = None, quantization_always_ram: bool = True) -> Tuple[bool, bool]:
+    """Create the collection if missing, with the payload indexes used for
+    filtering. With `sparse_vector`, the collection also gets a named sparse
+    vector with the IDF modifier (BM25 scoring). Storage options (on-disk
+    vectors/payload, HNSW m/ef_construct, 'scalar' or 'binary' quantization)
+    only apply to a newly created collection.
+
+    Returns (created, sparse_ok): whether the collection was created by this
+    call (so nothing is indexed in it yet), and whether `sparse_vector` can be
+    written; an existing collection created without it keeps working
+    dense-only (recreate it to enable).
+    """
     # Create or ensure collection (case-insensitive distance)
     dist = getattr(qm.Distance, distance.upper())
+    quant = quantization_config(quantization, quantization_always_ram)
     try:
-        client.get_collection(collection_name=name)
+        info = client.get_collection(collection_name=name)
         logger.info("Collection '%s' exists.", name)
     except Exception:
         client.recreate_collection(
             collection_name=name,
-            vectors_config=qm.VectorParams(size=vector_size, distance=dist),
+            vectors_config=qm.VectorParams(size=vector_size, distance=dist, on_disk=on_disk_vectors or None),
+            sparse_vectors_config={sparse_vector: qm.SparseVectorParams(modifier=qm.Modifier.IDF)} if sparse_vector else None,
+            hnsw_config=qm.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct) if (hnsw_m or hnsw_ef_construct) else None,
+            quantization_config=quant,
+            on_disk_payload=on_disk_payload or None,
         )
-        logger.info("Collection '%s' created (size=%s).", name, vector_size)
+        logger.info("Collection '%s' created (size=%s, sparse=%s, quantization=%s, on_disk=%s).",
+                    name, vector_size, sparse_vector, quantization, on_disk_vectors)
+        ensure_payload_indexes(client, name)
+        return True, bool(sparse_vector)
+    ensure_payload_indexes(client, name, getattr(info, "payload_schema", None))
+    if sparse_vector and sparse_vector not in _sparse_names(info):
+        logger.warning("Collection '%s' has no sparse vector '%s'; indexing dense vectors only. "
+                       "Recreate the collection to enable hybrid search.", name, sparse_vector)
+        return False, False
+    return False, bool(sparse_vector)
 
 
 def upsert_points(
@@ -115,32 +224,65 @@ def upsert_points(
     payloads: List[Dict[str, Any]],
     ids: Optional[List[Any]] = None,
     expected_dim: Optional[int] = None,
-    batch_wait: bool = True
-) -> Tuple[int, int]:
+    batch_wait: bool = True,
+    l2_normalize: bool = False,
+    retries: int = 0,
+    backoff: float = 0.5,
+    sparse: Optional[List[Tuple[List[int], List[float]]]] = None,
+    sparse_name: str = "bm25",
+) -> Tuple[int, int, List[Any]]:
     """
     Upsert points with robust normalization.
-    Returns (num_upserted, num_skipped).
+    Returns (num_upserted, num_skipped, accepted_ids) where accepted_ids are
+    the entries of `ids` that were actually sent.
     - vectors: list of raw embedding objects (list/[[...]]/dict)
     - payloads: list of payload dicts (same length)
-    - ids: optional original ids (strings) - these will be stored in payload as '_orig_id'
+    - ids: optional original ids (strings) - stored in payload as '_orig_id' and
+      hashed into a deterministic point id (random when missing)
     - expected_dim: if provided, validate vector length (or will try to query collection)
+    - l2_normalize: scale vectors to unit length before upserting
+    - retries/backoff: retry a failed upsert with exponential backoff (ids are
+      deterministic, so retrying is idempotent)
+    - sparse: optional (indices, values) per vector, stored as the named
+      sparse vector `sparse_name` next to the dense one
+    Well-formed batches are validated in one shot as a float32 matrix; only
+    malformed batches go through the per-vector `_normalize_vector` path.
+    Vectors containing NaN/inf are skipped.
     """
     if ids is None:
         ids = [None] * len(vectors)
+    if sparse is None:
+        sparse = [None] * len(vectors)
 
     # try to infer expected_dim from collection if not provided
     if expected_dim is None:
         expected_dim = _get_expected_dim(client, collection, fallback=None)
 
     points = []
+    accepted = []
     upserted = 0
     skipped = 0
 
-    for raw_vec, payload, orig_id in zip(vectors, payloads, ids):
-        vec = _normalize_vector(raw_vec, expected_dim=expected_dim)
+    matrix = _to_matrix(vectors, expected_dim)
+    if matrix is not None:
+        finite = np.isfinite(matrix).all(axis=1)
+        if l2_normalize:
+            matrix = _l2_normalize(matrix)
+        clean = [row if ok else None for row, ok in zip(matrix.tolist(), finite.tolist())]
+    else:
+        clean = []
+        for raw_vec in vectors:
+            vec = _normalize_vector(raw_vec, expected_dim=expected_dim)
+            if vec and not all(np.isfinite(vec)):
+                vec = None
+            if vec and l2_normalize:
+                vec = _l2_normalize(np.asarray(vec, dtype=np.float32)).tolist()
+            clean.append(vec)
+
+    for vec, payload, orig_id, sp in zip(clean, payloads, ids, sparse):
         if not vec:
             skipped += 1
-            logger.debug("Skipping vector (could not normalize or empty). orig_id=%s", orig_id)
+            logger.debug("Skipping vector (could not normalize, empty or non-finite). orig_id=%s", orig_id)
             continue
 
         # final dimension check (if known)
@@ -154,17 +296,52 @@ def upsert_points(
         if orig_id is not None:
             pl["_orig_id"] = orig_id
 
-        # use a safe UUID for qdrant point id
-        pid = str(uuid.uuid4())
+        # deterministic UUID from the chunk id; random only when there is none
+        pid = point_id(orig_id) if orig_id is not None else str(uuid.uuid4())
 
-        points.append(PointStruct(id=pid, vector=vec, payload=pl))
+        if sp and sp[0]:
+            # "" is the collection's unnamed dense vector
+            vector = {"": vec, sparse_name: qm.SparseVector(indices=sp[0], values=sp[1])}
+        else:
+            vector = vec
+        points.append(PointStruct(id=pid, vector=vector, payload=pl))
+        accepted.append(orig_id)
         upserted += 1
 
     if points:
         # upsert in one call (small number). If large, caller should call in batches.
-        client.upsert(collection_name=collection, points=points, wait=batch_wait)
+        for attempt in range(retries + 1):
+            try:
+                client.upsert(collection_name=collection, points=points, wait=batch_wait)
+                break
+            except Exception as e:
+                if attempt >= retries:
+                    raise
+                delay = backoff * (2 ** attempt)
+                logger.warning("Upsert of %d points failed (%s); retrying in %.1fs", len(points), e, delay)
+                time.sleep(delay)
         logger.info("Upserted %d points (skipped %d).", upserted, skipped)
     else:
         logger.warning("No valid points to upsert (skipped %d).", skipped)
 
-    return upserted, skipped
+    return upserted, skipped, accepted
+
+
+def consistency_barrier(client: QdrantClient, collection: str):
+    """Block until every update sent earlier with wait=False has been applied.
+
+    Qdrant applies updates in WAL order, so a waited no-op (deleting a point id
+    that never exists) completes only after all preceding upserts.
+    """
+    client.delete(collection_name=collection,
+                  points_selector=qm.PointIdsList(points=[point_id("__barrier__")]), wait=True)
+
+
+def delete_points(client: QdrantClient, collection: str, chunk_ids: List[str], batch_size: int = 1000) -> int:
+    """Delete points by chunk id (see point_id). Returns number requested."""
+    for i in range(0, len(chunk_ids), batch_size):
+        ids = [point_id(c) for c in chunk_ids[i:i + batch_size]]
+        client.delete(collection_name=collection, points_selector=qm.PointIdsList(points=ids), wait=True)
+    if chunk_ids:
+        logger.info("Deleted %d stale points.", len(chunk_ids))
+    return len(chunk_ids)
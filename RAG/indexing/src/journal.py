@@ -0,0 +1,85 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+import hashlib
+import json
+import os
+import time
+
+
+@dataclass
+class ResumeState:
+    run_id: str
+    offset: int = 0  # stream position after the last checkpoint (JSONL sources)
+    last_key: Optional[str] = None
+    done_keys: Set[str] = field(default_factory=set)  # checkpoint keys (meetings / documents) fully upserted
+    upserted_batches: int = 0
+
+
+class IngestJournal:
+    """Append-only JSONL journal of an ingest run, one file per command + input.
+
+    Records the run start, every batch as it is embedded and upserted, each
+    checkpoint released by the pipeline, and completion. Each line is flushed
+    and fsynced, so after a crash `resume_state` tells where to continue.
+    """
+
+    def __init__(self, directory: str, command: str, source_input: str):
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha1(f"{command}\x00{os.path.abspath(source_input) if os.path.exists(source_input) else source_input}".encode("utf-8")).hexdigest()[:12]
+        self.path = os.path.join(directory, f"{command}-{digest}.jsonl")
+        self.command = command
+        self.source_input = source_input
+        self._f = None
+
+    def resume_state(self) -> Optional[ResumeState]:
+        """State of the last unfinished run for this input, or None."""
+        if not os.path.exists(self.path):
+            return None
+        state: Optional[ResumeState] = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # torn last line after a crash
+                event = rec.get("event")
+                if event == "start":
+                    state = ResumeState(run_id=rec["run_id"])
+                elif state is None:
+                    continue
+                elif event == "checkpoint":
+                    state.offset = rec.get("offset", state.offset)
+                    state.last_key = rec.get("key")
+                    if rec.get("key") is not None:
+                        state.done_keys.add(rec["key"])
+                elif event == "batch" and rec.get("stage") == "upserted":
+                    state.upserted_batches += 1
+                elif event == "complete":
+                    state = None
+        return state
+
+    def start(self, run_id: str, resumed: bool):
+        self._f = open(self.path, "a" if resumed else "w", encoding="utf-8")
+        self._write({"event": "start", "run_id": run_id, "command": self.command,
+                     "input": self.source_input, "resumed": resumed})
+
+    def batch(self, stage: str, seq: int, size: int):
+        self._write({"event": "batch", "stage": stage, "seq": seq, "size": size})
+
+    def checkpoint(self, offset: int, key: Optional[str]):
+        self._write({"event": "checkpoint", "offset": offset, "key": key})
+
+    def complete(self, stats: Dict[str, Any]):
+        self._write({"event": "complete", **stats})
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _write(self, rec: Dict[str, Any]):
+        rec["ts"] = time.time()
+        self._f.write(json.dumps(rec) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
@@ -1,45 +1,219 @@
-
 from __future__ import annotations
-from typing import Generator, Dict, Any
+from typing import Generator, Dict, Any, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from multiprocessing import connection as mp_connection
+import itertools
+import logging
+import multiprocessing
 import os, time
 import fitz  # PyMuPDF
 from docx import Document
 
-def _read_pdf(path: str) -> str:
-    text_parts = []
+from ..pipeline import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+def _iter_pdf_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page_no, text) one page at a time (1-based, blank pages skipped)."""
     with fitz.open(path) as doc:
-        for page in doc:
-            text_parts.append(page.get_text("text"))
-    return "\n".join(text_parts).strip()
+        for page_no, page in enumerate(doc, 1):
+            text = page.get_text("text")
+            if text.strip():
+                yield page_no, text
 
 def _read_docx(path: str) -> str:
     d = Document(path)
     return "\n".join(p.text for p in d.paragraphs).strip()
 
-def iter_docs(root: str) -> Generator[Dict[str, Any], None, None]:
-    now = int(time.time()*1000)
+def _guard_pages(pages: Iterator[Tuple[int, str]], path: str, stats: ExtractStats,
+                 page_no: int) -> Iterator[Tuple[int, str]]:
+    try:
+        for page_no, text in pages:
+            yield page_no, text
+    except Exception as e:
+        logger.warning("Stopped reading %s after a page error: %s", path, e)
+        stats.partial.append((path, f"after page {page_no}: {type(e).__name__}: {e}"))
+
+def _lazy_pdf(path: str, stats: ExtractStats) -> Dict[str, Any]:
+    # Open eagerly (so broken files fail here) but stream the remaining pages
+    # into the chunker instead of holding the whole document in memory.
+    pages = _iter_pdf_pages(path)
+    first = next(pages, None)
+    if first is None:
+        return {"pages": []}
+    return {"pages": itertools.chain([first], _guard_pages(pages, path, stats, first[0]))}
+
+# extractors return the item content: {"pages": [(page_no, text), ...]} or {"text": ...}
+_READERS = {
+    ".pdf": lambda path: {"pages": list(_iter_pdf_pages(path))},
+    ".docx": lambda path: {"text": _read_docx(path)},
+}
+
+
+@dataclass
+class ExtractStats:
+    parsed: int = 0
+    unsupported: int = 0
+    empty: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)  # (path, reason)
+    timed_out: List[str] = field(default_factory=list)
+    partial: List[Tuple[str, str]] = field(default_factory=list)  # (path, reason): indexed up to a page error
+    resumed: int = 0  # already indexed by the interrupted run being resumed
+
+    def summary(self) -> str:
+        lines = [f"Extracted {self.parsed} documents; {len(self.empty)} empty, "
+                 f"{len(self.failed)} failed, {len(self.timed_out)} timed out, {len(self.partial)} partial, "
+                 f"{self.unsupported} unsupported files skipped"
+                 + (f", {self.resumed} already indexed" if self.resumed else "")]
+        lines += [f"  failed: {p} ({reason})" for p, reason in self.failed]
+        lines += [f"  timed out: {p}" for p in self.timed_out]
+        lines += [f"  partial: {p} ({reason})" for p, reason in self.partial]
+        return "\n".join(lines)
+
+
+def _origin_id(path: str, root: str) -> str:
+    return os.path.relpath(path, root).replace("\\","/")
+
+def _iter_files(root: str, stats: ExtractStats, skip: Optional[Set[str]] = None) -> Iterator[str]:
     for dirpath, _, filenames in os.walk(root):
         for fn in filenames:
             path = os.path.join(dirpath, fn)
-            ext = os.path.splitext(fn.lower())[1]
-            try:
-                if ext == ".pdf":
-                    text = _read_pdf(path)
-                elif ext in (".docx", ):
-                    text = _read_docx(path)
-                else:
+            if os.path.splitext(fn.lower())[1] not in _READERS:
+                stats.unsupported += 1
+            elif skip and _origin_id(path, root) in skip:
+                stats.resumed += 1
+            else:
+                yield path
+
+def _extract(path: str) -> Dict[str, Any]:
+    return _READERS[os.path.splitext(path.lower())[1]](path)
+
+def _extract_in_child(conn, path: str):
+    try:
+        conn.send(("ok", _extract(path)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def _finish(conn, proc, path: str) -> Tuple[str, str, Any]:
+    try:
+        status, result = conn.recv()
+    except EOFError:
+        status, result = "error", f"worker exited with code {proc.exitcode}"
+    conn.close()
+    proc.join()
+    return path, status, result
+
+def _extract_parallel(paths: Iterator[str], workers: int, timeout: Optional[float]) -> Iterator[Tuple[str, str, Any]]:
+    """Extract files in up to `workers` child processes, yielding
+    (path, status, content-or-reason) in completion order. A child that exceeds
+    `timeout` seconds is killed, so one pathological file cannot stall the run.
+
+    Only time spent waiting for the children counts against `timeout`: while
+    the consumer holds the generator at `yield` (backpressure), finished
+    children just wait with their result in the pipe.
+    """
+    ctx = multiprocessing.get_context()
+    active: Dict[Any, List[Any]] = {}  # conn -> [process, path, seconds left or None]
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(active) < workers:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                    break
+                recv, send = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=_extract_in_child, args=(send, path), daemon=True)
+                proc.start()
+                send.close()
+                active[recv] = [proc, path, timeout or None]
+            if not active:
+                return
+
+            budgets = [left for _, _, left in active.values() if left is not None]
+            t0 = time.monotonic()
+            ready = mp_connection.wait(list(active), timeout=max(0.0, min(budgets)) if budgets else None)
+            waited = time.monotonic() - t0
+            done = []
+            for conn in ready:
+                proc, path, _ = active.pop(conn)
+                done.append(_finish(conn, proc, path))
+            for conn, entry in list(active.items()):
+                if entry[2] is None:
                     continue
-            except Exception:
-                continue
-            if not text:
-                continue
-            origin_id = os.path.relpath(path, root).replace("\\","/")
-            yield {
-                "doc_id": f"{origin_id}",
-                "source": "drive",
-                "origin_id": origin_id,
-                "title": fn,
-                "speaker": None,
-                "timestamp": now,
-                "text": text
-            }
+                entry[2] -= waited
+                if entry[2] > 0:
+                    continue
+                proc, path, _ = active.pop(conn)
+                if conn.poll():  # finished just as its time ran out
+                    done.append(_finish(conn, proc, path))
+                    continue
+                proc.kill()
+                proc.join()
+                conn.close()
+                done.append((path, "timeout", None))
+            yield from done
+    finally:
+        for conn, (proc, _, _) in active.items():
+            proc.kill()
+            proc.join()
+            conn.close()
+
+def iter_docs(root: str, workers: int = 0, timeout: Optional[float] = None,
+              stats: Optional[ExtractStats] = None, skip: Optional[Set[str]] = None,
+              checkpoints: bool = False) -> Generator[Any, None, None]:
+    """Yield one item per PDF/DOCX under `root`.
+
+    PDF items carry "pages" ((page_no, text) pairs) instead of "text"; in
+    sequential mode the pages are read lazily as the chunker consumes them.
+    With `workers` > 0, files are parsed in a pool of child processes and
+    yielded in completion order; `timeout` (seconds) applies per file in that
+    mode. Skipped and failed files, and PDFs cut short by a page error, are
+    recorded in `stats`. Files whose origin id is in `skip` are not read; with
+    `checkpoints`, a pipeline.Checkpoint keyed by origin id follows each document.
+    """
+    stats = stats if stats is not None else ExtractStats()
+    now = int(time.time()*1000)
+    paths = _iter_files(root, stats, skip)
+    if workers > 0:
+        results = _extract_parallel(paths, workers, timeout)
+    else:
+        def _sequential():
+            for path in paths:
+                try:
+                    if path.lower().endswith(".pdf"):
+                        yield path, "ok", _lazy_pdf(path, stats)
+                    else:
+                        yield path, "ok", _extract(path)
+                except Exception as e:
+                    yield path, "error", f"{type(e).__name__}: {e}"
+        results = _sequential()
+
+    for path, status, content in results:
+        if status == "timeout":
+            logger.warning("Timed out extracting %s", path)
+            stats.timed_out.append(path)
+            continue
+        if status != "ok":
+            logger.warning("Failed to extract %s: %s", path, content)
+            stats.failed.append((path, content))
+            continue
+        if not (content.get("text") or content.get("pages")):
+            stats.empty.append(path)
+            continue
+        stats.parsed += 1
+        fn = os.path.basename(path)
+        origin_id = _origin_id(path, root)
+        yield {
+            "doc_id": f"{origin_id}",
+            "source": "drive",
+            "origin_id": origin_id,
+            "title": fn,
+            "speaker": None,
+            "timestamp": now,
+            **content
+        }
+        if checkpoints:
+            yield Checkpoint(stats.parsed, origin_id)
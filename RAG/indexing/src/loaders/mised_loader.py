@@ -1,11 +1,16 @@
 
 from __future__ import annotations
-from typing import Iterable, Dict, Any, Generator, Optional
-import json, os, requests, time
+from typing import BinaryIO, Iterable, Iterator, Dict, Any, Generator, List, Optional, Tuple
+from contextlib import contextmanager
+import gzip, io, json, logging, os, requests, time
 
 
 import re
 
+from ..pipeline import Checkpoint
+
+logger = logging.getLogger(__name__)
+
 def is_useless_chunk(text: str) -> bool:
     """
     Mark as useless if chunk only contains:
@@ -56,22 +61,157 @@ def clean_text(text: str) -> str:
     cleaned = re.sub(r"\s+", " ", cleaned)     # normalize spaces
     return cleaned.strip()
 
-def _iter_jsonl_lines(path_or_url: str) -> Iterable[str]:
-    if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
-        r = requests.get(path_or_url, timeout=120)
-        r.raise_for_status()
-        for line in r.text.splitlines():
-            if line.strip():
-                yield line
+DEFAULT_FILLER_PHRASES = ["mm hmm", "hmm", "uh", "um", "uh huh", "yeah", "okay", "ok",
+                          "bye", "see you", "thanks", "thank you"]
+DEFAULT_SHORT_FILLERS = ["ah", "oh", "hmm", "mm", "alright", "bye", "yeah", "okay", "ok", "definitely"]
+
+def _trie_pattern(phrases: List[str]) -> str:
+    """Regex alternation factored by common prefixes ("ok(?:ay)?"), which the
+    backtracking engine matches much faster than a flat list of alternatives."""
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + build(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            return (body if len(alts) > 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return build(trie)
+
+class TranscriptCleaner:
+    """Precompiled replacement for clean_text + is_useless_chunk.
+
+    Filler phrases are removed by one prefix-factored regex, whitespace is
+    normalized with str.split, and a single fullmatch decides whether what is
+    left is only punctuation or at most two short filler words. Counters
+    record why segments were dropped.
+    """
+
+    def __init__(self, filler_phrases: Optional[List[str]] = None, short_fillers: Optional[List[str]] = None):
+        phrases = [p.strip() for p in (filler_phrases if filler_phrases is not None else DEFAULT_FILLER_PHRASES) if p.strip()]
+        shorts = [w.strip() for w in (short_fillers if short_fillers is not None else DEFAULT_SHORT_FILLERS) if w.strip()]
+        heads = re.escape("".join(sorted({p[0].lower() for p in phrases})))
+        self._fillers = re.compile(rf"(?=[{heads}])\b{_trie_pattern(phrases)}\b", re.IGNORECASE) if phrases else None
+        short = rf"(?:{_trie_pattern(shorts)}\b\W*){{0,2}}" if shorts else ""
+        self._useless = re.compile(rf"\W*{short}", re.IGNORECASE)
+        self.seen = 0
+        self.kept = 0
+        self.dropped_empty = 0
+        self.dropped_filler = 0
+
+    def clean(self, text: str) -> Optional[str]:
+        """Return the cleaned segment text, or None if the segment should be dropped."""
+        self.seen += 1
+        if self._fillers is not None:
+            text = self._fillers.sub("", text or "")
+        t = " ".join(text.split())
+        if not t:
+            self.dropped_empty += 1
+            return None
+        if self._useless.fullmatch(t):
+            self.dropped_filler += 1
+            return None
+        self.kept += 1
+        return t
+
+    def summary(self) -> str:
+        return (f"{self.seen} segments: kept {self.kept}, dropped {self.dropped_empty} empty, "
+                f"{self.dropped_filler} filler/punctuation-only")
+
+def _is_url(path_or_url: str) -> bool:
+    return path_or_url.startswith("http://") or path_or_url.startswith("https://")
+
+def _compression(path_or_url: str) -> Optional[str]:
+    name = path_or_url.split("?", 1)[0].lower()
+    if name.endswith(".gz"):
+        return "gzip"
+    if name.endswith(".zst") or name.endswith(".zstd"):
+        return "zstd"
+    return None
+
+def _decompress(raw: BinaryIO, kind: Optional[str]) -> BinaryIO:
+    if kind == "gzip":
+        return gzip.GzipFile(fileobj=raw)
+    if kind == "zstd":
+        import zstandard  # optional: pip install zstandard
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+    return raw
+
+def _skip(f: BinaryIO, n: int):
+    while n > 0:
+        chunk = f.read(min(n, 1 << 20))
+        if not chunk:
+            break
+        n -= len(chunk)
+
+@contextmanager
+def _open_jsonl(path_or_url: str, offset: int = 0) -> Iterator[BinaryIO]:
+    """Open a local or remote (optionally .gz/.zst) JSONL stream positioned at
+    `offset` bytes of the uncompressed content, without reading it all into memory."""
+    kind = _compression(path_or_url)
+    if _is_url(path_or_url):
+        headers = {"Range": f"bytes={offset}-"} if offset and kind is None else {}
+        with requests.get(path_or_url, stream=True, timeout=120, headers=headers) as r:
+            r.raise_for_status()
+            r.raw.decode_content = True
+            r.raw.auto_close = False  # let BufferedReader see EOF instead of a closed file
+            f = _decompress(io.BufferedReader(r.raw, buffer_size=1 << 20), kind)
+            if offset and r.status_code != 206:
+                _skip(f, offset)  # server ignored Range (or compressed input): skip locally
+            yield f
     else:
-        with open(path_or_url, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    yield line
+        with open(path_or_url, "rb") as raw:
+            if kind is None:
+                raw.seek(offset)
+                yield raw
+            else:
+                f = _decompress(raw, kind)
+                _skip(f, offset)
+                yield f
 
-def load_mised_segments(path_or_url: str) -> Generator[Dict[str, Any], None, None]:
-    now = int(time.time()*1000)
-    for line in _iter_jsonl_lines(path_or_url):
+def iter_jsonl_records(path_or_url: str, offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """Stream non-blank lines as (offset_after_line, line), starting at `offset`."""
+    with _open_jsonl(path_or_url, offset) as f:
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                yield offset, line
+
+def _iter_jsonl_lines(path_or_url: str) -> Iterable[str]:
+    for _, line in iter_jsonl_records(path_or_url):
+        yield line.decode("utf-8")
+
+def _seconds(value: Any) -> Optional[float]:
+    """Parse a segment time: seconds as number, "12.5s", or "HH:MM:SS(.fff)"."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    v = str(value).strip().rstrip("s")
+    try:
+        if ":" in v:
+            total = 0.0
+            for part in v.split(":"):
+                total = total * 60 + float(part)
+            return total
+        return float(v)
+    except ValueError:
+        return None
+
+def _iter_meetings(path_or_url: str, cleaner: Optional[TranscriptCleaner] = None,
+                   offset: int = 0) -> Generator[Tuple[str, List[Dict[str, Any]], int], None, None]:
+    """Yield (meeting_id, cleaned segments, offset_after_record) per JSONL record;
+    useless segments are dropped."""
+    cleaner = cleaner or TranscriptCleaner()
+    for offset, line in iter_jsonl_records(path_or_url, offset):
         try:
             obj = json.loads(line)
         except Exception:
@@ -79,17 +219,30 @@ def load_mised_segments(path_or_url: str) -> Generator[Dict[str, Any], None, Non
         meeting = obj.get("meeting", {})
         mid = meeting.get("meetingId") or obj.get("dialogId") or "unknown"
         segs = meeting.get("transcriptSegments") or []
-        for s in segs:
-            speaker = s.get("speakerName")
-            text = s.get("text","").strip()
-
-            text = clean_text(text)
-            if not text or is_useless_chunk(text):
+        cleaned = []
+        for idx, s in enumerate(segs):
+            text = cleaner.clean(s.get("text", ""))
+            if text is None:
                 continue
-            
-            print(f"text embedded : {text}")
+            speaker = s.get("speakerName")
+            cleaned.append({
+                "index": idx,
+                "speaker": speaker,
+                "text": text,
+                "start": _seconds(s.get("startTime", s.get("start"))),
+                "end": _seconds(s.get("endTime", s.get("end"))),
+            })
+        yield mid, cleaned, offset
+    logger.info("MISeD cleaning: %s", cleaner.summary())
 
- 
+def load_mised_segments(path_or_url: str, cleaner: Optional[TranscriptCleaner] = None,
+                        offset: int = 0, checkpoints: bool = False) -> Generator[Any, None, None]:
+    """One item per cleaned segment. Reading starts at byte `offset`; with
+    `checkpoints`, a pipeline.Checkpoint follows each meeting's items."""
+    now = int(time.time()*1000)
+    for mid, segs, end in _iter_meetings(path_or_url, cleaner, offset):
+        for s in segs:
+            speaker = s["speaker"]
             yield {
                 "doc_id": f"{mid}-{speaker or 'unknown'}",
                 "source": "mised",
@@ -97,6 +250,68 @@ def load_mised_segments(path_or_url: str) -> Generator[Dict[str, Any], None, Non
                 "title": f"{mid}",
                 "speaker": speaker,
                 "timestamp": now,
-                "text": text
+                "text": s["text"]
             }
         # Optionally emit a meeting-level record here if needed
+        if checkpoints:
+            yield Checkpoint(end, mid)
+
+def _window_item(mid: str, window: List[Dict[str, Any]], now: int) -> Dict[str, Any]:
+    speakers = list(dict.fromkeys(s["speaker"] or "unknown" for s in window))
+    starts = [s["start"] for s in window if s["start"] is not None]
+    ends = [s["end"] if s["end"] is not None else s["start"] for s in window]
+    ends = [e for e in ends if e is not None]
+    return {
+        "doc_id": mid,
+        "source": "mised",
+        "origin_id": mid,
+        "title": f"{mid}",
+        "speaker": speakers[0] if len(speakers) == 1 else None,
+        "timestamp": now,
+        "text": "\n".join(f"{s['speaker'] or 'unknown'}: {s['text']}" for s in window),
+        "meta": {
+            "speakers": speakers,
+            "start_time": min(starts) if starts else None,
+            "end_time": max(ends) if ends else None,
+            "segment_start": window[0]["index"],
+            "segment_end": window[-1]["index"],
+        },
+    }
+
+def load_mised_windows(path_or_url: str, max_chars: int = 1500, max_seconds: Optional[float] = 120.0,
+                       max_turns: Optional[int] = 8, cleaner: Optional[TranscriptCleaner] = None,
+                       offset: int = 0, checkpoints: bool = False) -> Generator[Any, None, None]:
+    """Merge consecutive transcript segments of a meeting into windows.
+
+    A window closes before it would exceed `max_chars` of text, span more than
+    `max_seconds` (when segments carry times) or contain more than `max_turns`
+    speaker turns (runs of consecutive segments by one speaker, so at most
+    `max_turns - 1` speaker changes). Items use the meeting id as doc_id, so chunk ids are
+    unique per window, and carry speakers/start/end in "meta". `offset` and
+    `checkpoints` behave as in load_mised_segments.
+    """
+    now = int(time.time()*1000)
+    for mid, segs, end_offset in _iter_meetings(path_or_url, cleaner, offset):
+        window: List[Dict[str, Any]] = []
+        chars = 0
+        turns = 0  # speaker turns in the window
+        for s in segs:
+            if window:
+                new_turn = s["speaker"] != window[-1]["speaker"]
+                start = next((w["start"] for w in window if w["start"] is not None), None)
+                end = s["end"] if s["end"] is not None else s["start"]
+                if (chars + len(s["text"]) > max_chars
+                        or (max_turns and turns + new_turn > max_turns)
+                        or (max_seconds and start is not None and end is not None and end - start > max_seconds)):
+                    yield _window_item(mid, window, now)
+                    window, chars, turns = [], 0, 0
+                else:
+                    turns += new_turn
+            if not window:
+                turns = 1
+            window.append(s)
+            chars += len(s["text"])
+        if window:
+            yield _window_item(mid, window, now)
+        if checkpoints:
+            yield Checkpoint(end_offset, mid)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+
+# payload fields that change on every run without the content changing
+_VOLATILE_FIELDS = ("timestamp", "content_hash")
+
+
+def content_hash(payload: Dict[str, Any], model: str) -> str:
+    """sha256 over the embedding model and the chunk payload (text included)."""
+    stable = {k: v for k, v in payload.items() if k not in _VOLATILE_FIELDS}
+    h = hashlib.sha256(model.encode("utf-8"))
+    h.update(json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class Manifest:
+    """SQLite record of which chunks are indexed in a collection and their content hashes.
+
+    Every chunk and document touched by a run is stamped with that run's id, so
+    after a successful run anything left with an older id is stale.
+    """
+
+    def __init__(self, path: str, run_id: Optional[str] = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # a resumed run reuses the interrupted run's id so its earlier work counts as seen
+        self.run_id = run_id or uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY, doc_id TEXT, source TEXT, hash TEXT, run_id TEXT);
+            CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, source TEXT, run_id TEXT);
+            CREATE INDEX IF NOT EXISTS chunks_doc ON chunks(doc_id);
+        """)
+
+    def touch_doc(self, doc_id: str, source: Optional[str]):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO docs (doc_id, source, run_id) VALUES (?, ?, ?)",
+                             (doc_id, source, self.run_id))
+
+    def is_current(self, chunk_id: str, digest: str) -> bool:
+        """True if the chunk is already indexed with this hash (and mark it as seen)."""
+        with self._lock:
+            cur = self._db.execute("UPDATE chunks SET run_id = ? WHERE chunk_id = ? AND hash = ?",
+                                   (self.run_id, chunk_id, digest))
+            return cur.rowcount > 0
+
+    def record(self, payloads: Iterable[Dict[str, Any]]):
+        rows = [(p["chunk_id"], p.get("doc_id"), p.get("source"), p["content_hash"], self.run_id) for p in payloads]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, doc_id, source, hash, run_id) VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def keep(self, chunk_ids: Iterable[str]):
+        """Mark chunks as seen without updating their hash, e.g. when their new
+        version was rejected: the indexed version stays (not stale) and the
+        next run retries them."""
+        with self._lock:
+            self._db.executemany("UPDATE chunks SET run_id = ? WHERE chunk_id = ?",
+                                 [(self.run_id, c) for c in chunk_ids])
+            self._db.commit()
+
+    def clear(self):
+        """Forget every chunk and document, e.g. because the collection was
+        recreated and no longer holds any of them."""
+        with self._lock:
+            self._db.execute("DELETE FROM chunks")
+            self._db.execute("DELETE FROM docs")
+            self._db.commit()
+
+    def stale(self, prune_source: Optional[str] = None) -> List[str]:
+        """Chunk ids not seen in this run whose document was (re)processed.
+
+        With `prune_source`, also every unseen chunk of that source, i.e. chunks
+        of documents that disappeared from the input.
+        """
+        with self._lock:
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT chunk_id FROM chunks WHERE run_id != ? AND "
+                "(doc_id IN (SELECT doc_id FROM docs WHERE run_id = ?) OR source = ?)",
+                (self.run_id, self.run_id, prune_source)).fetchall()
+        return [r[0] for r in rows]
+
+    def forget(self, chunk_ids: List[str]):
+        with self._lock:
+            self._db.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(c,) for c in chunk_ids])
+            if chunk_ids:
+                self._db.execute("DELETE FROM docs WHERE doc_id NOT IN (SELECT doc_id FROM chunks)")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
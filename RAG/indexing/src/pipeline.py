@@ -0,0 +1,226 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from tqdm import tqdm
+from .manifest import Manifest, content_hash
+
+
+@dataclass
+class Checkpoint:
+    """Marker a loader may place in its item stream (e.g. after each meeting).
+
+    run_pipeline hands it to `on_checkpoint` once every chunk of the items
+    before it has been upserted, so it is safe to resume from.
+    """
+    offset: int
+    key: Optional[str] = None
+
+
+@dataclass
+class Batch:
+    texts: List[str]
+    payloads: List[Dict[str, Any]]
+    ids: List[str]
+    vectors: Optional[List[Any]] = None
+    checkpoints: List[Checkpoint] = field(default_factory=list)
+
+
+@dataclass
+class PipelineStats:
+    embedded: int = 0
+    upserted: int = 0
+    skipped: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+def iter_chunks(items: Iterable[Dict[str, Any]],
+                chunker: Callable[[Dict[str, Any]], Iterable[Tuple[str, Any, Any]]]) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+    """Lazily chunk loader items into (text, payload, chunk_id) triples.
+
+    `chunker` comes from chunking.make_chunker. Items carrying "pages" (an
+    iterable of (page_no, text)) are chunked as a stream and their chunks
+    record page_start/page_end; an item's "meta" dict is merged into the
+    payload of each of its chunks. Chunk numbering
+    continues across items sharing a doc_id, so chunk ids stay unique (and
+    stable for the same input order).
+    """
+    next_idx: Dict[str, int] = {}
+    for it in items:
+        if isinstance(it, Checkpoint):
+            yield it
+            continue
+        chunks = chunker(it)
+        idx = next_idx.get(it["doc_id"], 0)
+        for ch, page_start, page_end in chunks:
+            cid = f"{it['doc_id']}#{idx}"
+            idx += 1
+            next_idx[it["doc_id"]] = idx
+            payload = {
+                "chunk_id": cid,
+                "doc_id": it["doc_id"],
+                "source": it.get("source"),
+                "origin_id": it.get("origin_id"),
+                "title": it.get("title"),
+                "speaker": it.get("speaker"),
+                "timestamp": it.get("timestamp"),
+                "text": ch
+            }
+            payload.update(it.get("meta") or {})
+            if page_start is not None:
+                payload["page_start"] = page_start
+                payload["page_end"] = page_end
+            yield ch, payload, cid
+
+
+def skip_unchanged(chunks: Iterable[Tuple[str, Dict[str, Any], str]], manifest: Manifest, model: str,
+                   counter: Optional["PipelineStats"] = None, force: bool = False) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+    """Drop chunks whose content hash matches the manifest; tag the rest with `content_hash`.
+
+    With `force`, no chunk is dropped (full re-index); documents are still
+    touched, so chunks that disappeared are still found by `stale`.
+    """
+    last_doc = None
+    for chunk in chunks:
+        if isinstance(chunk, Checkpoint):
+            yield chunk
+            continue
+        text, payload, cid = chunk
+        if payload["doc_id"] != last_doc:
+            last_doc = payload["doc_id"]
+            manifest.touch_doc(last_doc, payload.get("source"))
+        digest = content_hash(payload, model)
+        if not force and manifest.is_current(cid, digest):
+            if counter is not None:
+                counter.unchanged += 1
+            continue
+        payload["content_hash"] = digest
+        yield text, payload, cid
+
+
+def record_upserted(manifest: Manifest, batch: Batch, accepted: Iterable[str]):
+    """Record the batch chunks that were upserted. Rejected ones (bad vectors)
+    keep their previous manifest entry, marked as seen so `stale` does not
+    delete the version still indexed; they are retried next run."""
+    accepted = set(accepted)
+    manifest.record(p for p, cid in zip(batch.payloads, batch.ids) if cid in accepted)
+    rejected = [cid for cid in batch.ids if cid not in accepted]
+    if rejected:
+        manifest.keep(rejected)
+
+
+def iter_batches(chunks: Iterable[Tuple[str, Dict[str, Any], str]], size: int) -> Iterator[Batch]:
+    """Group chunk triples into Batches of at most `size` without materializing the stream.
+
+    Checkpoint markers ride along with the batch being filled when they
+    arrive (possibly an otherwise empty final batch).
+    """
+    batch = Batch([], [], [])
+    for chunk in chunks:
+        if isinstance(chunk, Checkpoint):
+            batch.checkpoints.append(chunk)
+            continue
+        text, payload, cid = chunk
+        batch.texts.append(text)
+        batch.payloads.append(payload)
+        batch.ids.append(cid)
+        if len(batch.texts) >= size:
+            yield batch
+            batch = Batch([], [], [])
+    if batch.texts or batch.checkpoints:
+        yield batch
+
+
+def _embed_stage(embed: Callable[[List[str]], List[Any]], batch: Batch) -> Batch:
+    batch.vectors = embed(batch.texts)
+    return batch
+
+
+def run_pipeline(
+    batches: Iterable[Batch],
+    embed: Callable[[List[str]], List[Any]],
+    upsert: Callable[[Batch], Tuple[int, int]],
+    embed_workers: int = 4,
+    upsert_workers: int = 1,
+    max_in_flight: int = 8,
+    total: Optional[int] = None,
+    stats: Optional[PipelineStats] = None,
+    on_checkpoint: Optional[Callable[[Checkpoint], None]] = None,
+    on_batch: Optional[Callable[[str, int, Batch], None]] = None,
+) -> PipelineStats:
+    """Embed batches on a worker pool and upsert them as soon as they are ready.
+
+    `batches` is consumed lazily and at most `max_in_flight` batches (embedding
+    or upserting) are outstanding at any time, so memory stays bounded by the
+    batch size regardless of corpus size. `total` may be None when unknown.
+    `upsert` returns (num_upserted, num_skipped) like `indexer.upsert_points`.
+    Batches may finish out of order; a batch's checkpoints are passed to
+    `on_checkpoint` only after it and every earlier batch are upserted.
+    `on_batch(stage, seq, batch)` is called as each batch is "embedded" and
+    "upserted". Both callbacks run on the calling thread.
+    """
+    stats = stats or PipelineStats()
+    # batch sequence numbers, for releasing checkpoints in stream order
+    finished: set = set()
+    waiting: Dict[int, List[Checkpoint]] = {}
+    next_seq = 0
+
+    def finish(seq: int):
+        nonlocal next_seq
+        finished.add(seq)
+        while next_seq in finished:
+            finished.discard(next_seq)
+            for cp in waiting.pop(next_seq, ()):
+                if on_checkpoint is not None:
+                    on_checkpoint(cp)
+            next_seq += 1
+
+    embed_bar = tqdm(total=total, desc="Embedding", unit="chunk", position=0)
+    upsert_bar = tqdm(total=total, desc="Upserting", unit="chunk", position=1)
+    pending: Dict[Future, Tuple[str, Batch, int]] = {}
+
+    with ThreadPoolExecutor(max(1, embed_workers), thread_name_prefix="embed") as embed_pool, \
+         ThreadPoolExecutor(max(1, upsert_workers), thread_name_prefix="upsert") as upsert_pool:
+
+        def collect(block: bool):
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED, timeout=None if block else 0)
+            for fut in done:
+                stage, batch, seq = pending.pop(fut)
+                if stage == "embed":
+                    fut.result()
+                    stats.embedded += len(batch.texts)
+                    embed_bar.update(len(batch.texts))
+                    if on_batch is not None:
+                        on_batch("embedded", seq, batch)
+                    pending[upsert_pool.submit(upsert, batch)] = ("upsert", batch, seq)
+                else:
+                    upserted, skipped = fut.result()
+                    stats.upserted += upserted
+                    stats.skipped += skipped
+                    upsert_bar.update(len(batch.texts))
+                    if on_batch is not None:
+                        on_batch("upserted", seq, batch)
+                    finish(seq)
+
+        try:
+            for seq, batch in enumerate(batches):
+                if batch.checkpoints:
+                    waiting[seq] = batch.checkpoints
+                if not batch.texts:
+                    finish(seq)
+                    continue
+                while len(pending) >= max_in_flight:
+                    collect(block=True)
+                pending[embed_pool.submit(_embed_stage, embed, batch)] = ("embed", batch, seq)
+                collect(block=False)
+            while pending:
+                collect(block=True)
+        except BaseException:
+            for fut in pending:
+                fut.cancel()
+            raise
+        finally:
+            embed_bar.close()
+            upsert_bar.close()
+    return stats
@@ -1,31 +1,82 @@
 
 from __future__ import annotations
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import yaml, os
 
 class QdrantConf(BaseModel):
     url: str = "http://localhost:6333"
     api_key: Optional[str] = None
     collection: str = "meetings"
+    prefer_grpc: bool = True
+    grpc_port: int = 6334
+
+class IndexConf(BaseModel):
+    # applied when the collection is created
+    on_disk_vectors: bool = False  # original vectors memory-mapped from disk
+    on_disk_payload: bool = False
+    hnsw_m: Optional[int] = None  # graph degree; Qdrant default 16
+    hnsw_ef_construct: Optional[int] = None  # build-time beam; Qdrant default 100
+    quantization: Optional[str] = None  # 'scalar' (int8) or 'binary'
+    quantization_always_ram: bool = True  # keep quantized vectors in RAM
+    # search-time parameters (benchmark; mirror them in the backend settings)
+    search_hnsw_ef: Optional[int] = None
+    search_rescore: bool = True  # re-rank quantized candidates with the original vectors
+    search_oversampling: Optional[float] = None  # fetch top_k * oversampling quantized candidates
 
 class EmbeddingsConf(BaseModel):
     backend: str = "ollama"  # or 'sentence_transformers'
     model: str = "nomic-embed-text"
     st_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    ollama_url: str = "http://localhost:11434"
+    batch_size: int = 64  # texts per embedding request
+    timeout: float = 60.0  # seconds per embedding request
+    cache_path: Optional[str] = ".embedding_cache/embeddings.sqlite"  # null disables
+    cache_max_entries: int = 1_000_000
+    normalize: bool = False  # L2-normalize vectors before upserting
 
 class ChunkConf(BaseModel):
-    max_chars: int = 2000
+    mode: str = "sentence"  # or 'chars' (fixed character windows)
+    max_tokens: int = 512
+    overlap_tokens: int = 64
+    tokenizer: Optional[str] = None  # HF tokenizer name for exact counts; estimate when unset
+    max_chars: int = 2000  # 'chars' mode
     overlap: int = 250
 
+class SparseConf(BaseModel):
+    enabled: bool = True  # also write BM25 sparse vectors for hybrid search
+    vector_name: str = "bm25"
+    k1: float = 1.2
+    b: float = 0.75
+    avg_doc_len: float = 256.0  # expected tokens per chunk (after stopwords) for length normalization
+
 class IngestionConf(BaseModel):
     default_source: str = "custom"
+    embed_workers: int = 4  # concurrent embedding requests
+    max_in_flight: int = 8  # batches embedding or upserting at once
+    upsert_workers: int = 4  # parallel upsert requests to Qdrant
+    upsert_retries: int = 3
+    extract_workers: int = 0  # >0: parse PDFs/DOCX in that many child processes
+    extract_timeout: Optional[float] = 300.0  # seconds per file (parallel mode only)
+    manifest_dir: str = ".index_manifest"  # content-hash manifest per collection
+    journal_dir: str = ".ingest_journal"  # per-run checkpoint journals for --resume
+
+class MisedConf(BaseModel):
+    mode: str = "window"  # or 'segment' (one item per transcript segment)
+    window_max_chars: int = 1500
+    window_max_seconds: Optional[float] = 120.0  # applies when segments carry times
+    window_max_turns: Optional[int] = 8  # speaker turns per window
+    filler_phrases: Optional[List[str]] = None  # removed from segments; None = built-in lexicon
+    short_fillers: Optional[List[str]] = None  # segments of <=2 of these words are dropped
 
 class Settings(BaseModel):
     qdrant: QdrantConf = QdrantConf()
+    index: IndexConf = IndexConf()
     embeddings: EmbeddingsConf = EmbeddingsConf()
     chunking: ChunkConf = ChunkConf()
+    sparse: SparseConf = SparseConf()
     ingestion: IngestionConf = IngestionConf()
+    mised: MisedConf = MisedConf()
 
 def load_settings(path: str = None) -> Settings:
     path = path or os.environ.get("MEETING_RAG_CONFIG", "config.yaml")
@@ -0,0 +1,49 @@
+# src/sparse.py
+"""BM25-style sparse vectors for hybrid search.
+
+Tokens are hashed into the uint32 index space (no vocabulary to ship or keep
+in sync). Documents get a saturated term frequency; the IDF part is applied
+by Qdrant at query time (sparse vector `modifier: idf`), so corpus statistics
+never have to be computed here. The backend keeps a copy of the tokenizer in
+app/sparse.py; both must produce the same indices.
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import List, Tuple
+import re
+import zlib
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in into is it its of on or so that the their then there
+these they this to was we were will with you your he she him her them our us do does did not no yes
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def token_index(token: str) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def encode_document(text: str, k1: float = 1.2, b: float = 0.75, avg_doc_len: float = 256.0) -> Tuple[List[int], List[float]]:
+    """(indices, values) with BM25 term-frequency saturation and length normalization."""
+    tokens = tokenize(text)
+    if not tokens:
+        return [], []
+    norm = k1 * (1 - b + b * len(tokens) / avg_doc_len)
+    weights = {}
+    for tok, tf in Counter(tokens).items():
+        # hash collisions just add up
+        idx = token_index(tok)
+        weights[idx] = weights.get(idx, 0.0) + tf * (k1 + 1) / (tf + norm)
+    return list(weights), list(weights.values())
+
+
+def encode_query(text: str) -> Tuple[List[int], List[float]]:
+    indices = sorted({token_index(t) for t in tokenize(text)})
+    return indices, [1.0] * len(indices)
@@ -0,0 +1,31 @@
+from src.chunking import chunk_sentences
+
+words = lambda text: len(text.split())
+
+
+def test_chunks_respect_budget_and_overlap_whole_sentences():
+    sentences = [f"Sentence {i} has exactly six words." for i in range(10)]
+    chunks = list(chunk_sentences([(1, " ".join(sentences[:5])), (2, " ".join(sentences[5:]))],
+                                  max_tokens=18, overlap_tokens=6, count_tokens=words))
+    assert all(words(text) <= 18 for text, _, _ in chunks)
+    # every sentence survives intact, in order
+    seen = [s for text, _, _ in chunks for s in sentences if s in text]
+    assert sorted(set(seen), key=sentences.index) == sentences
+    # consecutive chunks share their boundary sentence
+    for (a, _, _), (b, _, _) in zip(chunks, chunks[1:]):
+        assert a.split(". ")[-1].rstrip(".") in b
+    assert chunks[0][1] == 1 and chunks[-1][2] == 2
+
+
+def test_overlong_sentence_is_split():
+    long = " ".join(["word"] * 50) + "."
+    chunks = list(chunk_sentences([(None, long)], max_tokens=20, overlap_tokens=0, count_tokens=words))
+    assert len(chunks) >= 3 and all(words(t) <= 20 for t, _, _ in chunks)
+
+
+def test_overlong_sentence_parts_are_measured_by_the_counter():
+    chars = len  # one token per character: far denser than the ~4 chars/token estimate
+    long = " ".join(["budget"] * 100) + "."
+    chunks = list(chunk_sentences([(None, long)], max_tokens=50, overlap_tokens=0, count_tokens=chars))
+    assert all(chars(t) <= 50 for t, _, _ in chunks)
+    assert " ".join(t for t, _, _ in chunks) == long
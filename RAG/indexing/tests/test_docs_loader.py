@@ -0,0 +1,35 @@
+import multiprocessing
+import time
+
+import pytest
+
+from src.loaders import docs_loader
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="children must inherit the patched _extract")
+def test_slow_consumer_does_not_time_out_finished_children(monkeypatch):
+    def extract(path):
+        time.sleep(0.1)
+        return {"text": path}
+
+    monkeypatch.setattr(docs_loader, "_extract", extract)
+    statuses = []
+    for path, status, _ in docs_loader._extract_parallel(iter(["a", "b", "c", "d"]), workers=2, timeout=0.5):
+        statuses.append(status)
+        time.sleep(0.7)  # longer than the timeout, while the other child's result waits in the pipe
+    assert statuses == ["ok"] * 4
+
+
+def test_pdf_cut_short_by_a_page_error_is_reported(tmp_path, monkeypatch):
+    def pages(path):
+        yield 1, "First page."
+        raise RuntimeError("broken xref")
+
+    monkeypatch.setattr(docs_loader, "_iter_pdf_pages", pages)
+    (tmp_path / "a.pdf").write_bytes(b"")
+    stats = docs_loader.ExtractStats()
+    (item,) = docs_loader.iter_docs(str(tmp_path), stats=stats)
+    assert list(item["pages"]) == [(1, "First page.")]
+    assert stats.parsed == 1
+    assert stats.partial == [(str(tmp_path / "a.pdf"), "after page 1: RuntimeError: broken xref")]
+    assert "1 partial" in stats.summary()
@@ -0,0 +1,25 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.embeddings import Embedder, EmbeddingBackend
+
+
+def test_concurrent_timeouts_halve_batch_size_once():
+    emb = Embedder(EmbeddingBackend(name="ollama", model="m"), batch_size=64)
+    barrier = threading.Barrier(4)
+    sizes = set()
+
+    def fake_embed(batch):
+        sizes.add(len(batch))
+        if len(batch) > 32:
+            barrier.wait(timeout=5)  # all workers time out at size 64 together
+            raise requests.Timeout()
+        return [[0.0]] * len(batch)
+
+    emb._ollama_embed = fake_embed
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(emb.embed, [["t"] * 64] * 4))
+    assert all(len(r) == 64 for r in results)
+    assert sizes == {64, 32}  # four simultaneous timeouts at 64 halve it once, not down to 4
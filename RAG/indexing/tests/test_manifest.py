@@ -0,0 +1,75 @@
+from src.indexer import upsert_points
+from src.manifest import Manifest, content_hash
+from src.pipeline import Batch, record_upserted, skip_unchanged
+
+
+class FakeClient:
+    def __init__(self):
+        self.points = {}
+
+    def upsert(self, collection_name, points, wait=True):
+        self.points.update({p.id: p for p in points})
+
+
+def _batch(doc_id, texts, model="m"):
+    payloads = []
+    for i, text in enumerate(texts):
+        p = {"chunk_id": f"{doc_id}#{i}", "doc_id": doc_id, "source": "drive", "text": text}
+        p["content_hash"] = content_hash(p, model)
+        payloads.append(p)
+    return Batch(list(texts), payloads, [p["chunk_id"] for p in payloads])
+
+
+def _run(path, batch, vectors):
+    manifest = Manifest(path)
+    manifest.touch_doc(batch.payloads[0]["doc_id"], "drive")
+    _, skipped, accepted = upsert_points(FakeClient(), "c", vectors, batch.payloads, batch.ids, expected_dim=2)
+    record_upserted(manifest, batch, accepted)
+    stale = manifest.stale()
+    manifest.forget(stale)
+    manifest.close()
+    return skipped, stale
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "m.sqlite")
+    assert _run(path, _batch("d", ["a", "b", "c"]), [[1, 0], [0, 1], [1, 1]]) == (0, [])
+    # the document shrank: its last chunk is stale
+    assert _run(path, _batch("d", ["a", "b"]), [[1, 0], [0, 1]]) == (0, ["d#2"])
+
+
+def test_partially_skipped_batch_keeps_indexed_chunks(tmp_path):
+    path = str(tmp_path / "m.sqlite")
+    _run(path, _batch("d", ["a", "b", "c"]), [[1, 0], [0, 1], [1, 1]])
+    # re-index with edited text; one vector has the wrong dimension and is rejected
+    skipped, stale = _run(path, _batch("d", ["a2", "b2", "c2"]), [[1, 0], [0, 1, 2], [1, 1]])
+    assert skipped == 1
+    assert stale == []  # neither the upserted chunks nor the rejected one get deleted
+    # the rejected chunk still has its old hash, so the next run retries it
+    manifest = Manifest(path)
+    retried = _batch("d", ["a2", "b2", "c2"])
+    assert [manifest.is_current(c, p["content_hash"]) for c, p in zip(retried.ids, retried.payloads)] == [True, False, True]
+    manifest.close()
+
+
+def test_upsert_points_reports_accepted_ids():
+    client = FakeClient()
+    upserted, skipped, accepted = upsert_points(client, "c", [[1, 0], [1, 2, 3], [0, 1]],
+                                                [{"text": "x"}] * 3, ["a", "b", "c"], expected_dim=2)
+    assert (upserted, skipped, accepted) == (2, 1, ["a", "c"])
+    assert len(client.points) == 2
+
+
+def test_full_reindex_and_cleared_manifest_skip_nothing(tmp_path):
+    path = str(tmp_path / "m.sqlite")
+    batch = _batch("d", ["a", "b"])
+    _run(path, batch, [[1, 0], [0, 1]])
+    chunks = lambda: [(t, dict(p), cid) for t, p, cid in zip(batch.texts, batch.payloads, batch.ids)]
+    manifest = Manifest(path)
+    assert list(skip_unchanged(chunks(), manifest, "m")) == []
+    # --full re-upserts everything
+    assert len(list(skip_unchanged(chunks(), manifest, "m", force=True))) == 2
+    # so does a run into a recreated collection, whose manifest is cleared
+    manifest.clear()
+    assert len(list(skip_unchanged(chunks(), manifest, "m"))) == 2
+    manifest.close()
@@ -0,0 +1,68 @@
+import functools
+import gzip
+import json
+import re
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.loaders.mised_loader import iter_jsonl_records
+
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    """Static files; honours "Range: bytes=N-" unless `ranges` is off."""
+    ranges = True
+    statuses = []
+
+    def do_GET(self):
+        m = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if not (self.ranges and m):
+            self.statuses.append(200)
+            return super().do_GET()
+        with open(self.translate_path(self.path), "rb") as f:
+            data = f.read()[int(m.group(1)):]
+        self.statuses.append(206)
+        self.send_response(206)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(ranges):
+        handler = type("Handler", (RangeHandler,), {"ranges": ranges, "statuses": []})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=str(tmp_path)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}", handler.statuses
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("name, ranges, resumed_status", [
+    ("m.jsonl", True, 206),
+    ("m.jsonl", False, 200),  # Range ignored: skipped locally
+    ("m.jsonl.gz", True, 200),  # offsets are in uncompressed bytes: never a Range request
+])
+def test_jsonl_resumes_from_offset(tmp_path, serve, name, ranges, resumed_status):
+    lines = [json.dumps({"meeting": {"meetingId": f"m{i}", "transcriptSegments": []}}).encode() + b"\n" for i in range(3)]
+    data = b"".join(lines)
+    (tmp_path / name).write_bytes(gzip.compress(data) if name.endswith(".gz") else data)
+    base, statuses = serve(ranges)
+    for source in (f"{base}/{name}", str(tmp_path / name)):
+        records = list(iter_jsonl_records(source))
+        assert [line for _, line in records] == lines
+        assert records[-1][0] == len(data)
+        # resume after the first meeting
+        assert list(iter_jsonl_records(source, records[0][0])) == records[1:]
+    assert statuses == [200, resumed_status]
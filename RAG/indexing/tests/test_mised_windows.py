@@ -0,0 +1,13 @@
+import json
+
+from src.loaders.mised_loader import load_mised_windows
+
+
+def test_windows_hold_at_most_max_turns_speaker_turns(tmp_path):
+    speakers = ["Ann", "Ann", "Bob", "Ann", "Bob", "Bob", "Ann"]
+    segs = [{"speakerName": sp, "text": f"Point number {i} about the quarterly budget plan."} for i, sp in enumerate(speakers)]
+    path = tmp_path / "m.jsonl"
+    path.write_text(json.dumps({"meeting": {"meetingId": "m1", "transcriptSegments": segs}}) + "\n")
+    windows = list(load_mised_windows(str(path), max_chars=10_000, max_seconds=None, max_turns=2))
+    turns = [[line.split(":")[0] for line in w["text"].split("\n")] for w in windows]
+    assert turns == [["Ann", "Ann", "Bob"], ["Ann", "Bob", "Bob"], ["Ann"]]